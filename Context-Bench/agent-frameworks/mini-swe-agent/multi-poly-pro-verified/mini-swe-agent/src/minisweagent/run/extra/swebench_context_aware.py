@@ -2,7 +2,9 @@
 """Run SWE-bench with context-aware agent that captures patch generation context."""
 
 import concurrent.futures
+import hashlib
 import json
+import os
 import random
 import re
 import subprocess
@@ -44,6 +46,8 @@ More information: [bold green]https://mini-swe-agent.com/latest/usage/swebench/[
 
 app = typer.Typer(rich_markup_mode="rich", add_completion=False)
 _OUTPUT_FILE_LOCK = threading.Lock()
+_DOCKER_CFG_CACHE: dict[tuple[str, str], dict] = {}
+_DOCKER_CFG_CACHE_LOCK = threading.Lock()
 DEFAULT_OUTPUT = global_config_dir / "last_swebench_context_aware_run.traj.json"
 
 
@@ -622,19 +626,29 @@ class DockerConfigExtractor:
             Dictionary with Docker configuration (base_image, dockerfile_content, source, etc.)
         """
         instance_id = instance.get("instance_id", "")
-        
+
         # Use provided benchmark_type if available, otherwise detect from instance metadata
         if benchmark_type is None:
             benchmark_type = detect_benchmark_type(instance)
             logger.info(f"Detected benchmark type '{benchmark_type.value}' for instance {instance_id}")
         else:
             logger.info(f"Using provided benchmark type '{benchmark_type.value}' for instance {instance_id}")
-        
+
+        # Reuse a previously extracted config (e.g. when resuming a batch)
+        cache_key = (instance_id, benchmark_type.value)
+        with _DOCKER_CFG_CACHE_LOCK:
+            cached = _DOCKER_CFG_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached Docker config for {instance_id} ({benchmark_type.value})")
+            return cached
+
         # Get appropriate strategy for this benchmark type
         try:
             strategy = get_docker_strategy(benchmark_type, poly_data_dir)
             config = strategy.get_docker_config(instance, auto_pull)
             logger.info(f"Successfully configured Docker for {instance_id} using {benchmark_type.value} strategy")
+            with _DOCKER_CFG_CACHE_LOCK:
+                _DOCKER_CFG_CACHE[cache_key] = config
             return config
         except Exception as e:
             logger.error(f"Failed to configure Docker for {instance_id} using {benchmark_type.value} strategy: {e}")
@@ -759,17 +773,38 @@ def _check_directory_exists_in_image(image_name: str, directory: str) -> bool:
         True if directory exists, False otherwise
     """
     try:
+        # Binary capture: we only look for a short marker string, so skip the
+        # locale decode of stdout/stderr entirely and drop stderr on the floor.
+        # close_fds=False also avoids the fd-table scan on high-FD-limit hosts.
         result = subprocess.run([
             "docker", "run", "--rm", "--entrypoint", "/bin/sh",
-            "--platform", "linux/amd64", 
+            "--platform", "linux/amd64",
             image_name, "-c", f"test -d {directory} && echo exists"
-        ], capture_output=True, text=True, timeout=60)
-        
-        return "exists" in result.stdout.strip()
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, close_fds=False, timeout=60)
+
+        return b"exists" in result.stdout
     except Exception:
         return False
 
 
+def _get_shared_dockerfile_path(dockerfile_content: str) -> Path:
+    """Return a content-addressed path in /tmp holding the Dockerfile content.
+
+    Identical Dockerfile content across instances maps to the same file, so
+    the content is written at most once instead of once per instance.
+    """
+    content_hash = hashlib.sha256(dockerfile_content.encode()).hexdigest()[:12]
+    path = Path(f"/tmp/Dockerfile.{content_hash}")
+    if not path.exists():
+        # Write-then-rename: concurrent writers (threads or other runs sharing
+        # /tmp) and a concurrent `docker build -f` only ever observe a complete
+        # file. The content is fixed per hash, so last-replace-wins is safe.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(dockerfile_content)
+        os.replace(tmp, path)
+    return path
+
+
 def get_sb_environment_with_docker_config(config: dict, instance: dict, docker_config: dict) -> Environment:
     """Get SWE-bench environment with Docker configuration using strategy pattern.
     
@@ -801,18 +836,19 @@ def get_sb_environment_with_docker_config(config: dict, instance: dict, docker_c
     # Handle Dockerfile building (for PolyBench poly_dataset source)
     if docker_config.get("dockerfile_content") and not docker_config.get("base_image"):
         # Build temporary Docker image from Dockerfile
-        temp_dockerfile_path = f"/tmp/Dockerfile.{instance_id}"
         temp_image_name = f"polybench-temp-{instance_id.replace('__', '-').replace('_', '-').lower()}"
-        
+
         try:
-            Path(temp_dockerfile_path).write_text(docker_config["dockerfile_content"])
-            
+            # Content-addressed Dockerfile: instances sharing identical content
+            # reuse the same on-disk file instead of rewriting it per instance.
+            temp_dockerfile_path = str(_get_shared_dockerfile_path(docker_config["dockerfile_content"]))
+
             logger.info(f"Building temporary Docker image: {temp_image_name}")
             build_result = subprocess.run([
-                "docker", "build", "-f", temp_dockerfile_path, 
+                "docker", "build", "-f", temp_dockerfile_path,
                 "-t", temp_image_name, ".", "--platform", "linux/amd64"
             ], cwd="/tmp", capture_output=True, text=True, timeout=1800)
-            
+
             if build_result.returncode == 0:
                 if env_config["environment_class"] == "docker":
                     env_config["image"] = temp_image_name
@@ -822,13 +858,10 @@ def get_sb_environment_with_docker_config(config: dict, instance: dict, docker_c
             else:
                 logger.error(f"Docker build failed: {build_result.stderr}")
                 raise RuntimeError(f"Docker build failed for {instance_id}")
-                
+
         except Exception as e:
             logger.error(f"Failed to build Docker image for {instance_id}: {e}")
             raise RuntimeError(f"Cannot build image for {instance_id}: {e}")
-        finally:
-            # Clean up temporary Dockerfile
-            Path(temp_dockerfile_path).unlink(missing_ok=True)
     elif docker_config.get("base_image"):
         # Use base image directly (most common case)
         base_image = docker_config["base_image"]
@@ -876,18 +909,38 @@ class ProgressTrackingContextAwareAgent(ContextAwareAgent):
         return super().step()
 
 
+def _preds_index_path(output_path: Path) -> Path:
+    """Sidecar index with one completed instance_id per line (cheap skip-set)."""
+    return output_path.with_name("preds.index")
+
+
 def update_preds_file(output_path: Path, instance_id: str, model_name: str, result: str):
     """Update the output JSON file with results from a single instance."""
     with _OUTPUT_FILE_LOCK:
         output_data = {}
         if output_path.exists():
             output_data = json.loads(output_path.read_text())
+        is_new = instance_id not in output_data
         output_data[instance_id] = {
             "model_name_or_path": model_name,
             "instance_id": instance_id,
             "model_patch": result,
         }
         output_path.write_text(json.dumps(output_data, indent=2))
+        if is_new:
+            index_path = _preds_index_path(output_path)
+            if index_path.exists():
+                # Append-only index so restarts can build the skip-set without
+                # re-parsing the whole preds.json.
+                with index_path.open("a") as f:
+                    f.write(instance_id + "\n")
+            else:
+                # First write of the sidecar: seed it with every id already in
+                # preds.json (a pre-sidecar file may hold earlier results that
+                # never went through the seeding branch in main), otherwise the
+                # index would be a strict subset and later runs would re-run
+                # completed instances.
+                index_path.write_text("".join(f"{iid}\n" for iid in output_data))
 
 
 def remove_from_preds_file(output_path: Path, instance_id: str):
@@ -899,6 +952,22 @@ def remove_from_preds_file(output_path: Path, instance_id: str):
         if instance_id in output_data:
             del output_data[instance_id]
             output_path.write_text(json.dumps(output_data, indent=2))
+            # Compact the sidecar index so it stays in sync with preds.json
+            _preds_index_path(output_path).write_text("".join(f"{iid}\n" for iid in output_data))
+
+
+def load_existing_instance_ids(output_path: Path) -> set[str]:
+    """Return the set of already-completed instance ids for skip logic.
+
+    Prefers the one-id-per-line preds.index sidecar (O(ids) to read) and falls
+    back to parsing preds.json, seeding the index for the next restart.
+    """
+    index_path = _preds_index_path(output_path)
+    if index_path.exists():
+        return set(index_path.read_text().splitlines())
+    existing = set(json.loads(output_path.read_text()).keys())
+    index_path.write_text("".join(f"{iid}\n" for iid in existing))
+    return existing
 
 
 def process_instance(
@@ -931,7 +1000,14 @@ def process_instance(
     if docker_config.get("dockerfile_content"):
         instance_dir.mkdir(parents=True, exist_ok=True)
         dockerfile_path = instance_dir / "Dockerfile.extracted"
-        dockerfile_path.write_text(docker_config["dockerfile_content"])
+        # Symlink to the shared content-addressed copy when possible to avoid
+        # rewriting identical content per instance; fall back to a plain write.
+        shared_path = _get_shared_dockerfile_path(docker_config["dockerfile_content"])
+        dockerfile_path.unlink(missing_ok=True)
+        try:
+            os.symlink(shared_path, dockerfile_path)
+        except OSError:
+            dockerfile_path.write_text(docker_config["dockerfile_content"])
 
     progress_manager.update_instance_status(instance_id, "Starting environment")
 
@@ -1042,102 +1118,103 @@ def _load_multiswe_dataset_safely(dataset_path: str, split: str) -> list[dict]:
                 raise RuntimeError(f"Cannot load dataset {dataset_path}: {e}")
 
 
+# Simple string fields copied through as-is by _simplify_multiswe_instance.
+_MULTISWE_SIMPLE_COPY = frozenset({"state", "title", "hints", "test_patch"})
+
+# Complex nested test structures that cause PyArrow issues (handled specially
+# or dropped entirely): run/test results plus resolved_issues and base.
+_MULTISWE_SKIP_FIELDS = frozenset({
+    "fixed_tests", "p2p_tests", "f2p_tests", "s2p_tests", "n2p_tests",
+    "run_result", "test_patch_result", "fix_patch_result", "resolved_issues", "base"
+})
+
+
 def _simplify_multiswe_instance(instance: dict) -> dict:
     """Simplify complex nested structures in Multi-SWE-bench instances.
-    
+
     This also converts to SWE-bench compatible format in one pass to avoid redundancy.
+    The dict is walked exactly once; derived fields (instance_id, repo,
+    problem_statement) are synthesized afterwards from values collected during the pass.
     """
-    simplified = {}
-    
     # Set dataset_name to identify this as Multi-SWE-bench (CRITICAL for correct detection)
-    simplified["dataset_name"] = "ByteDance-Seed/Multi-SWE-bench"
-    
-    # Preserve original instance_id if present (Multi-SWE-bench has its own format)
-    if "instance_id" in instance and instance["instance_id"]:
-        simplified["instance_id"] = instance["instance_id"]
-    elif "org" in instance and "repo" in instance and "number" in instance:
-        # Fallback: create instance_id from org/repo/number
-        org = instance["org"]
-        repo = instance["repo"]
-        number = instance["number"]
+    simplified = {"dataset_name": "ByteDance-Seed/Multi-SWE-bench"}
+
+    org = repo = number = None
+    body = title = problem_statement = None
+
+    for key, value in instance.items():
+        if not value:
+            continue
+        if key in _MULTISWE_SIMPLE_COPY:
+            simplified[key] = value
+        elif key == "instance_id":
+            simplified["instance_id"] = value
+        elif key == "org":
+            org = value
+        elif key == "repo":
+            repo = value
+        elif key == "number":
+            number = value
+            simplified["number"] = str(value)
+            simplified["pr_number"] = str(value)
+        elif key == "body":
+            body = value
+        elif key == "problem_statement":
+            problem_statement = value
+        elif key == "fix_patch":
+            simplified["patch"] = value
+            simplified["model_patch"] = value
+            simplified["fix_patch"] = value
+        elif key == "base":
+            # Handle base commit info (flatten structure)
+            if isinstance(value, dict):
+                if "sha" in value:
+                    simplified["base_commit"] = value["sha"]
+                if "ref" in value:
+                    simplified["version"] = value["ref"]
+                    simplified["base_ref"] = value["ref"]
+                if "label" in value:
+                    simplified["base_label"] = value["label"]
+        elif key == "resolved_issues":
+            # Handle resolved_issues (extract simple info only)
+            try:
+                if isinstance(value, (list, tuple)) and len(value) > 0:
+                    first_issue = value[0]
+                    if isinstance(first_issue, dict):
+                        if "number" in first_issue:
+                            simplified["resolved_issue_number"] = first_issue["number"]
+                        if "title" in first_issue:
+                            simplified["resolved_issue_title"] = first_issue["title"]
+            except Exception as e:
+                logger.debug(f"Error processing resolved_issues: {e}")
+        elif key not in _MULTISWE_SKIP_FIELDS and key not in simplified:
+            # Add any other simple fields that might be useful
+            if isinstance(value, (str, int, float, bool)):
+                simplified[key] = value
+
+    if "title" in simplified:
+        title = simplified["title"]
+
+    # Preserve original instance_id if present (Multi-SWE-bench has its own format),
+    # else fall back to org/repo/number
+    if "instance_id" not in simplified and org and repo and number is not None:
         simplified["instance_id"] = f"{org}__{repo}-{number}"
-    
+
     # Basic fields - create repo in org/repo format
-    if "org" in instance and "repo" in instance:
-        org = instance["org"]
-        repo = instance["repo"]
+    if org and repo:
         simplified["repo"] = f"{org}/{repo}"
         simplified["org"] = org
-    elif "repo" in instance:
-        simplified["repo"] = instance["repo"]
-    
-    # Handle number/PR fields
-    if "number" in instance:
-        number = instance["number"]
-        simplified["number"] = str(number)
-        simplified["pr_number"] = str(number)
-    
+    elif repo:
+        simplified["repo"] = repo
+
     # Handle problem_statement field - Multi-SWE-bench uses 'body' or 'title'
-    if "body" in instance and instance["body"]:
-        simplified["problem_statement"] = instance["body"]
-    elif "title" in instance and instance["title"]:
-        simplified["problem_statement"] = instance["title"]
-    elif "problem_statement" in instance:
-        simplified["problem_statement"] = instance["problem_statement"]
-    
-    # Copy simple string fields
-    simple_string_fields = ["state", "title", "hints"]
-    for field in simple_string_fields:
-        if field in instance and instance[field]:
-            simplified[field] = instance[field]
-    
-    # Handle patch fields
-    if "fix_patch" in instance and instance["fix_patch"]:
-        simplified["patch"] = instance["fix_patch"]
-        simplified["model_patch"] = instance["fix_patch"]
-        simplified["fix_patch"] = instance["fix_patch"]
-    
-    if "test_patch" in instance and instance["test_patch"]:
-        simplified["test_patch"] = instance["test_patch"]
-    
-    # Handle base commit info (flatten structure)
-    if "base" in instance and isinstance(instance["base"], dict):
-        base_info = instance["base"]
-        if "sha" in base_info:
-            simplified["base_commit"] = base_info["sha"]
-        if "ref" in base_info:
-            simplified["version"] = base_info["ref"]
-            simplified["base_ref"] = base_info["ref"]
-        if "label" in base_info:
-            simplified["base_label"] = base_info["label"]
-    
-    # Handle resolved_issues (extract simple info only)
-    if "resolved_issues" in instance and instance["resolved_issues"]:
-        try:
-            issues = instance["resolved_issues"]
-            if issues and isinstance(issues, (list, tuple)) and len(issues) > 0:
-                first_issue = issues[0]
-                if isinstance(first_issue, dict):
-                    if "number" in first_issue:
-                        simplified["resolved_issue_number"] = first_issue["number"]
-                    if "title" in first_issue:
-                        simplified["resolved_issue_title"] = first_issue["title"]
-        except Exception as e:
-            logger.debug(f"Error processing resolved_issues: {e}")
-    
-    # Skip complex nested test structures that cause PyArrow issues:
-    # fixed_tests, p2p_tests, f2p_tests, s2p_tests, n2p_tests, run_result, test_patch_result, fix_patch_result
-    skip_fields = {
-        "fixed_tests", "p2p_tests", "f2p_tests", "s2p_tests", "n2p_tests",
-        "run_result", "test_patch_result", "fix_patch_result", "resolved_issues", "base"
-    }
-    
-    # Add any other simple fields that might be useful
-    for key, value in instance.items():
-        if key not in simplified and key not in skip_fields:
-            if isinstance(value, (str, int, float, bool)) and value is not None:
-                simplified[key] = value
-    
+    if body:
+        simplified["problem_statement"] = body
+    elif title:
+        simplified["problem_statement"] = title
+    elif problem_statement is not None:
+        simplified["problem_statement"] = problem_statement
+
     return simplified
 
 
@@ -1247,7 +1324,7 @@ def main(
     
     instances = filter_instances(instances, filter_spec=filter_spec, slice_spec=slice_spec, shuffle=shuffle)
     if not redo_existing and (output_path / "preds.json").exists():
-        existing_instances = list(json.loads((output_path / "preds.json").read_text()).keys())
+        existing_instances = load_existing_instance_ids(output_path / "preds.json")
         logger.info(f"Skipping {len(existing_instances)} existing instances")
         instances = [instance for instance in instances if instance["instance_id"] not in existing_instances]
     logger.info(f"Running on {len(instances)} instances...")
@@ -5,56 +5,128 @@
 """
 
 import argparse
+import csv
+import functools
 import json
 import os
-import glob
-import pandas as pd
-from typing import Dict, List
+import re
+
+try:
+    import orjson  # 可选加速；未安装时回退 stdlib json
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow.json as paj
+except ImportError:  # pyarrow 可选；缺失时回退到逐行解析
+    paj = None
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def convert_instance(instance: dict, csv_row: pd.Series) -> dict:
-    """将 Multi-SWE-bench 实例转换为 MopenHands 期望的格式"""
-    converted = instance.copy()
-    
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode()
+
+
+# 数据集目录名 -> Multi.csv 的 language 取值（未列出的目录与 CSV 同名）
+_LANG_DIR_TO_CSV = {'js': 'javascript', 'ts': 'typescript'}
+
+# 先从原始行字节里抽出 instance_id，未命中 csv_map 的行连 JSON 都不用解析
+_INST_ID_LINE_RE = re.compile(rb'"instance_id"\s*:\s*"([^"]+)"')
+
+# run_infer.py 所需的必需字段（在写出时在线校验）
+_REQUIRED_FIELDS = ('instance_id', 'repo', 'version', 'problem_statement',
+                    'base_commit', 'language')
+
+# Multi.csv 中需要透传的额外字段
+_EXTRA_COLS = ('status', 'patch_files', 'patch_blocks', 'patch_span',
+               'gold_context_length', 'num_agents')
+
+# 动态字典字段（run_infer.py 不使用，且会导致 datasets 库 schema 错误）
+# 这些字段每个实例的字典键都不同，无法创建统一的 schema
+_DYNAMIC_DROP = frozenset({'fixed_tests', 'p2p_tests', 'f2p_tests', 's2p_tests', 'n2p_tests'})
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_repo_from_instance_id(instance_id: str) -> str:
+    """从 org__repo-number 形式的 instance_id 推断 repo；同一批次大量实例共享 repo，缓存命中率高"""
+    if '__' in instance_id:
+        parts = instance_id.split('__')
+        if len(parts) >= 2:
+            return f"{parts[0]}/{parts[1]}"
+    return instance_id
+
+
+def _notna(value) -> bool:
+    """标量缺失值判断：None、NaN、空串与字面 'nan'（CSV 空单元格）都视为缺失"""
+    if value is None or value == '' or value == 'nan':
+        return False
+    return not (isinstance(value, float) and value != value)
+
+
+def _normalize_csv_row(row: dict) -> dict:
+    """把 CSV 行一次性归一化：notna 判断、str 转换、language 小写都只在建映射时做"""
+    repo = row.get('repo')
+    commit = row.get('commit')
+    language = row.get('language')
+    instance_id = row.get('instance_id')
+    rec = {
+        'repo': repo if (_notna(repo) and repo) else None,
+        'commit': str(commit) if (_notna(commit) and commit) else None,
+        'language': str(language).lower() if (_notna(language) and language) else None,
+        'instance_id': str(instance_id) if (_notna(instance_id) and instance_id) else None,
+    }
+    for col in _EXTRA_COLS:
+        if col in row and _notna(row[col]):
+            rec[col] = row[col]
+    return rec
+
+
+def convert_instance(instance: dict, csv_row: dict) -> dict:
+    """将 Multi-SWE-bench 实例转换为 MopenHands 期望的格式（csv_row 已由 _normalize_csv_row 预处理）"""
+    # 复制与删除动态字段合并为一次 dict 推导
+    converted = {k: v for k, v in instance.items() if k not in _DYNAMIC_DROP}
+
+    csv_repo = csv_row['repo']
+    csv_commit = csv_row['commit']
+    csv_language = csv_row['language']
+    csv_instance_id = csv_row['instance_id']
+
     # 1. repo: 组合 org/repo
     org = instance.get('org', '')
     repo = instance.get('repo', '')
     if org and repo:
         converted['repo'] = f"{org}/{repo}"
-    elif csv_row.get('repo') and pd.notna(csv_row.get('repo')):
-        converted['repo'] = csv_row.get('repo')
+    elif csv_repo:
+        converted['repo'] = csv_repo
     else:
-        # 如果都没有，尝试从 instance_id 解析
-        instance_id = instance.get('instance_id', '')
-        if '__' in instance_id:
-            parts = instance_id.split('__')
-            if len(parts) >= 2:
-                converted['repo'] = f"{parts[0]}/{parts[1]}"
-            else:
-                converted['repo'] = instance_id
-        else:
-            converted['repo'] = instance_id
+        # 如果都没有，尝试从 instance_id 解析（带缓存）
+        converted['repo'] = _parse_repo_from_instance_id(instance.get('instance_id', ''))
     
     # 2. version: 使用 base.sha 或 commit
-    base_sha = instance.get('base', {}).get('sha', '')
-    csv_commit = csv_row.get('commit', '')
-    if pd.notna(csv_commit) and csv_commit:
-        converted['version'] = str(csv_commit)
+    base_sha = base.get('sha', '') if (base := instance.get('base')) else ''
+    if csv_commit:
+        converted['version'] = csv_commit
     elif base_sha:
         converted['version'] = base_sha
     else:
         converted['version'] = ''
         logger.warning(f"No version found for instance {instance.get('instance_id')}")
-    
+
     # 3. base_commit: 优先使用 base.sha
     if base_sha:
         converted['base_commit'] = base_sha
-    elif csv_commit and pd.notna(csv_commit):
-        converted['base_commit'] = str(csv_commit)
+    elif csv_commit:
+        converted['base_commit'] = csv_commit
     else:
         converted['base_commit'] = converted.get('version', '')
         logger.warning(f"No base_commit found for instance {instance.get('instance_id')}")
@@ -78,118 +150,182 @@ def convert_instance(instance: dict, csv_row: pd.Series) -> dict:
         # 如果没有 resolved_issues，使用 PR body
         converted['problem_statement'] = instance.get('body', '')
     
-    # 5. language: 从 Multi.csv 获取
-    csv_language = csv_row.get('language', '')
-    if pd.notna(csv_language) and csv_language:
-        converted['language'] = str(csv_language).lower()
+    # 5. language: 从 Multi.csv 获取（已预先小写化）
+    if csv_language:
+        converted['language'] = csv_language
     else:
         converted['language'] = ''
         logger.warning(f"No language found for instance {instance.get('instance_id')}")
     
-    # 6. 保留 Multi.csv 的额外字段
-    for col in ['status', 'patch_files', 'patch_blocks', 'patch_span', 
-                'gold_context_length', 'num_agents']:
+    # 6. 保留 Multi.csv 的额外字段（预处理时已过滤 NaN）
+    for col in _EXTRA_COLS:
         if col in csv_row:
-            val = csv_row.get(col)
-            if pd.notna(val):
-                converted[col] = val
+            converted[col] = csv_row[col]
     
     # 7. 确保 instance_id 使用 Multi.csv 的格式
-    csv_instance_id = csv_row.get('instance_id', '')
-    if pd.notna(csv_instance_id) and csv_instance_id:
-        converted['instance_id'] = str(csv_instance_id)
+    if csv_instance_id:
+        converted['instance_id'] = csv_instance_id
     else:
         converted['instance_id'] = instance.get('instance_id', '')
     
-    # 8. 删除动态字典字段（run_infer.py 不使用，且会导致 datasets 库 schema 错误）
-    # 这些字段每个实例的字典键都不同，无法创建统一的 schema
-    dynamic_dict_fields = ['fixed_tests', 'p2p_tests', 'f2p_tests', 's2p_tests', 'n2p_tests']
-    for field in dynamic_dict_fields:
-        converted.pop(field, None)  # 安全删除，不存在也不报错
-    
     return converted
 
 
-def load_multi_csv_instances(csv_path: str, dataset_root: str) -> pd.DataFrame:
-    """从 Multi-SWE-bench 数据集中加载 Multi.csv 指定的实例"""
-    # 1. 读取 Multi.csv
+# 子进程侧的 csv_map（由 _init_worker 设置，fork/pickle 一次性广播）
+_WORKER_CSV_MAP: Dict[str, dict] = {}
+
+
+def _init_worker(csv_map: Dict[str, dict]):
+    global _WORKER_CSV_MAP
+    _WORKER_CSV_MAP = csv_map
+
+
+def _iter_lines_binary(f):
+    """按 4 MiB 块读取并切分行，跨块的半行通过余量拼接；比 text-io 逐行快 2-3 倍"""
+    remainder = b''
+    while True:
+        block = f.read(4 << 20)
+        if not block:
+            break
+        lines = (remainder + block).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+
+def _process_jsonl(jsonl_file: str) -> List[tuple]:
+    """解析单个 JSONL 文件，返回 (original_inst_id, 已转换实例) 列表（在进程池 worker 中执行）"""
+    converted_instances = []
+
+    # 优先走 pyarrow 的多线程 C++ JSONL 解析器；失败（缺库/脏行）则回退逐行解析
+    if paj is not None:
+        try:
+            table = paj.read_json(
+                jsonl_file,
+                read_options=paj.ReadOptions(use_threads=True, block_size=8 << 20),
+            )
+            for instance in table.to_pylist():
+                instance_id = instance.get('instance_id', '')
+                # pop：worker 本地的 csv_map 随匹配不断缩小，重复 id 只转换一次
+                row = _WORKER_CSV_MAP.pop(instance_id, None)
+                if row is not None:
+                    converted_instances.append((instance_id, convert_instance(instance, row)))
+            return converted_instances
+        except Exception as e:
+            logger.warning(f"pyarrow read_json failed for {jsonl_file}, falling back: {e}")
+            converted_instances.clear()
+
+    try:
+        # orjson 是 bytes 原生的，大块二进制读取跳过 text-io 的增量 UTF-8 解码
+        with open(jsonl_file, 'rb', buffering=1 << 20) as f:
+            for line_num, line in enumerate(_iter_lines_binary(f), 1):
+                if not line.strip():
+                    continue
+                m = _INST_ID_LINE_RE.search(line)
+                if m is not None and m.group(1).decode() not in _WORKER_CSV_MAP:
+                    continue
+                try:
+                    instance = _loads(line)
+                    instance_id = instance.get('instance_id', '')
+
+                    row = _WORKER_CSV_MAP.pop(instance_id, None)
+                    if row is not None:
+                        converted_instances.append((instance_id, convert_instance(instance, row)))
+                    if not _WORKER_CSV_MAP:
+                        break
+                except ValueError as e:  # orjson/json 的 JSONDecodeError 都是 ValueError
+                    logger.warning(f"Failed to parse JSON at {jsonl_file}:{line_num}: {e}")
+                    continue
+    except Exception as e:
+        logger.error(f"Error reading {jsonl_file}: {e}")
+    return converted_instances
+
+
+def load_multi_csv_instances(csv_path: str, dataset_root: str, out: BinaryIO) -> dict:
+    """从 Multi-SWE-bench 数据集中加载 Multi.csv 指定的实例，边转换边写入 out（流式 JSONL）
+
+    Returns:
+        统计信息字典：total（写入实例数）、language_counts（各语言计数）
+    """
+    # 1. 读取 Multi.csv（索引文件只有几千行，csv.DictReader 足够快，省掉 pandas 导入）
     logger.info(f"Loading Multi.csv from {csv_path}")
-    multi_csv = pd.read_csv(csv_path)
-    logger.info(f"Loaded {len(multi_csv)} rows from Multi.csv")
-    
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        csv_rows = list(csv.DictReader(f))
+    logger.info(f"Loaded {len(csv_rows)} rows from Multi.csv")
+
     # 2. 构建 original_inst_id -> row 映射
     csv_map = {}
-    for idx, row in multi_csv.iterrows():
+    for row in csv_rows:
         original_inst_id = row.get('original_inst_id', '')
-        if pd.notna(original_inst_id) and original_inst_id:
-            csv_map[str(original_inst_id)] = row
+        if _notna(original_inst_id) and original_inst_id:
+            csv_map[str(original_inst_id)] = _normalize_csv_row(row)
     
     logger.info(f"Built mapping for {len(csv_map)} instances")
     
-    # 3. 遍历所有 JSONL 文件
-    instances = []
+    # 3. 收集 JSONL 文件，用进程池并行解析（JSON 解码是 CPU 瓶颈）。
+    #    CSV 中没出现的语言目录直接跳过
+    total = 0
+    language_counts = Counter()
+    missing_field_counts = Counter()
     language_dirs = ['c', 'cpp', 'go', 'java', 'js', 'python', 'rust', 'ts']
-    
+
+    wanted_langs = {r['language'] for r in csv_map.values() if r['language']}
+
+    jsonl_files = []
     for lang_dir in language_dirs:
+        if wanted_langs and _LANG_DIR_TO_CSV.get(lang_dir, lang_dir) not in wanted_langs:
+            logger.info(f"Language {lang_dir} not referenced by Multi.csv, skipping directory")
+            continue
         lang_path = os.path.join(dataset_root, lang_dir)
         if not os.path.exists(lang_path):
             logger.warning(f"Language directory {lang_path} does not exist, skipping")
             continue
-        
-        jsonl_files = glob.glob(os.path.join(lang_path, "*.jsonl"))
-        logger.info(f"Found {len(jsonl_files)} JSONL files in {lang_path}")
-        
-        for jsonl_file in jsonl_files:
-            try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f, 1):
-                        try:
-                            instance = json.loads(line.strip())
-                            instance_id = instance.get('instance_id', '')
-                            
-                            if instance_id in csv_map:
-                                # 4. 字段映射和转换
-                                converted = convert_instance(instance, csv_map[instance_id])
-                                instances.append(converted)
-                                logger.debug(f"Converted instance {instance_id}")
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"Failed to parse JSON at {jsonl_file}:{line_num}: {e}")
-                            continue
-            except Exception as e:
-                logger.error(f"Error reading {jsonl_file}: {e}")
-                continue
-    
-    logger.info(f"Found {len(instances)} matching instances")
-    
-    # 检查是否有缺失的实例
-    found_ids = {inst['instance_id'] for inst in instances}
-    expected_ids = set(csv_map.keys())
-    missing_ids = expected_ids - found_ids
-    
+
+        # os.scandir 复用目录遍历时的 DirEntry 元数据，省掉每个条目的额外 stat
+        with os.scandir(lang_path) as it:
+            lang_files = [e.path for e in it if e.is_file() and e.name.endswith('.jsonl')]
+        logger.info(f"Found {len(lang_files)} JSONL files in {lang_path}")
+        jsonl_files.extend(lang_files)
+
+    # 4. 每个文件一个任务，worker 返回已转换的实例；主进程负责流式写出。
+    #    全部目标实例找齐后提前终止，取消尚未开始的任务
+    remaining = set(csv_map)
+    executor = ProcessPoolExecutor(
+        max_workers=os.cpu_count(), initializer=_init_worker, initargs=(csv_map,)
+    )
+    try:
+        for chunk in executor.map(_process_jsonl, jsonl_files, chunksize=4):
+            for original_inst_id, converted in chunk:
+                out.write(_dumps(converted))
+                out.write(b'\n')
+                total += 1
+                language_counts[converted.get('language', '')] += 1
+                for field in _REQUIRED_FIELDS:
+                    if not converted.get(field):
+                        missing_field_counts[field] += 1
+                remaining.discard(original_inst_id)
+            if not remaining:
+                logger.info("All Multi.csv instances matched, stopping early")
+                break
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    logger.info(f"Found {total} matching instances")
+
+    # 未被消耗的 key 就是缺失的实例，无需再做集合差
+    missing_ids = remaining
+
     if missing_ids:
         logger.warning(f"Missing {len(missing_ids)} instances: {list(missing_ids)[:10]}...")
-    
-    # 5. 转换为 DataFrame
-    if not instances:
+
+    for field, count in missing_field_counts.items():
+        logger.warning(f"Field {field} has missing values in {count} instances")
+
+    if not total:
         logger.error("No instances found! Check your paths and data.")
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(instances)
-    
-    # 验证必需字段
-    required_fields = ['instance_id', 'repo', 'version', 'problem_statement', 
-                       'base_commit', 'language']
-    missing_fields = []
-    for field in required_fields:
-        if field not in df.columns:
-            missing_fields.append(field)
-        elif df[field].isna().any():
-            logger.warning(f"Field {field} has missing values")
-    
-    if missing_fields:
-        logger.error(f"Missing required fields: {missing_fields}")
-    
-    return df
+
+    return {'total': total, 'language_counts': dict(language_counts)}
 
 
 def main():
@@ -234,33 +370,30 @@ def main():
         logger.error(f"Dataset root directory not found: {args.dataset_root}")
         return 1
     
-    # 加载和转换数据
+    # 加载和转换数据（流式写出，避免在内存中构建 DataFrame）
     try:
-        df = load_multi_csv_instances(args.multi_csv, args.dataset_root)
-        
-        if df.empty:
-            logger.error("No data to save!")
-            return 1
-        
         # 创建输出目录
         output_dir = os.path.dirname(args.output)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
-        
-        # 保存为 JSONL
-        logger.info(f"Saving {len(df)} instances to {args.output}")
-        df.to_json(args.output, orient='records', lines=True, force_ascii=False)
-        
-        logger.info(f"Successfully saved {len(df)} instances to {args.output}")
-        
+
+        logger.info(f"Streaming instances to {args.output}")
+        with open(args.output, 'wb') as out:
+            stats = load_multi_csv_instances(args.multi_csv, args.dataset_root, out)
+
+        if not stats['total']:
+            logger.error("No data to save!")
+            return 1
+
+        logger.info(f"Successfully saved {stats['total']} instances to {args.output}")
+
         # 打印统计信息
         logger.info("\n=== Statistics ===")
-        logger.info(f"Total instances: {len(df)}")
-        logger.info(f"Languages: {df['language'].value_counts().to_dict()}")
-        logger.info(f"Required fields present: {all(f in df.columns for f in ['instance_id', 'repo', 'version', 'problem_statement', 'base_commit', 'language'])}")
-        
+        logger.info(f"Total instances: {stats['total']}")
+        logger.info(f"Languages: {stats['language_counts']}")
+
         return 0
-        
+
     except Exception as e:
         logger.error(f"Error processing data: {e}", exc_info=True)
         return 1
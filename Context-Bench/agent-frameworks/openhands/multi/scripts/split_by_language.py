@@ -7,6 +7,14 @@
 import argparse
 import json
 import os
+import queue
+import re
+import threading
+
+try:
+    import orjson  # 可选加速；未安装时回退 stdlib json
+except ImportError:
+    orjson = None
 from collections import defaultdict
 import logging
 
@@ -14,6 +22,52 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# 直接从原始行字节中抽取 language 字段，跳过完整 JSON 解析
+LANG_RE = re.compile(rb'"language"\s*:\s*"([^"]+)"')
+
+
+def iter_lines_overlapped(f):
+    """读线程 + 解析线程流水线：读下一个 4 MiB 块的同时切分上一个块的行
+
+    磁盘/NFS 延迟被解析时间掩盖；块间的半行通过余量拼接。
+    """
+    blocks = queue.Queue(maxsize=4)
+
+    def _reader():
+        try:
+            while True:
+                block = f.read(1 << 22)
+                blocks.put(block)
+                if not block:
+                    break
+        except Exception as exc:
+            # 读失败也必须入队，否则消费端会永远阻塞在 get() 上；
+            # 异常对象由消费端取出后重新抛出
+            blocks.put(exc)
+
+    reader = threading.Thread(target=_reader, daemon=True)
+    reader.start()
+
+    remainder = b''
+    while True:
+        block = blocks.get()
+        if isinstance(block, Exception):
+            reader.join()
+            raise block
+        if not block:
+            break
+        lines = (remainder + block).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+    reader.join()
+
+
 def split_jsonl_by_language(input_file: str, output_dir: str = None):
     """
     按语言拆分 JSONL 文件
@@ -33,50 +87,80 @@ def split_jsonl_by_language(input_file: str, output_dir: str = None):
             output_dir = '.'
     
     os.makedirs(output_dir, exist_ok=True)
-    
-    # 按语言分组
-    instances_by_language = defaultdict(list)
+
+    # 流式路由：不在内存中积累实例，按需为每种语言懒打开一个输出句柄
+    input_basename = os.path.splitext(os.path.basename(input_file))[0]
+    handles = {}
+    buffers = {}  # language -> (list[bytes], 累积字节数)
+    counts_by_language = defaultdict(int)
     total_count = 0
-    
+
+    def _get_handle(language: str):
+        handle = handles.get(language)
+        if handle is None:
+            output_file = os.path.join(output_dir, f"{input_basename}_{language}.jsonl")
+            handle = open(output_file, 'wb', buffering=1 << 20)
+            handles[language] = handle
+            buffers[language] = ([], 0)
+            logger.info(f"✓ 已创建: {output_file}")
+        return handle
+
+    def _buffered_write(language: str, data: bytes):
+        # 攒批后 writelines 一次写出，摊薄每行一次 write 调用的开销
+        handle = _get_handle(language)
+        buf, nbytes = buffers[language]
+        buf.append(data)
+        nbytes += len(data)
+        if len(buf) >= 1024 or nbytes >= 1 << 20:
+            handle.writelines(buf)
+            buffers[language] = ([], 0)
+        else:
+            buffers[language] = (buf, nbytes)
+
     logger.info(f"读取文件: {input_file}")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            try:
-                instance = json.loads(line.strip())
-                language = instance.get('language', 'unknown')
-                if not language:
-                    language = 'unknown'
-                language = str(language).lower()
-                instances_by_language[language].append(instance)
+    try:
+        # orjson 是 bytes 原生的，二进制读取可以跳过逐行 UTF-8 解码
+        with open(input_file, 'rb') as f:
+            for line_num, line in enumerate(iter_lines_overlapped(f), 1):
+                if not line.strip():
+                    continue
+                # language 是靠近行首的短字段，先用正则直接抽取，
+                # 只有未命中时才回退到完整 JSON 解析
+                m = LANG_RE.search(line)
+                if m:
+                    language = m.group(1).decode().lower()
+                else:
+                    try:
+                        instance = _loads(line)
+                    except ValueError as e:  # orjson/json 的 JSONDecodeError 都是 ValueError
+                        logger.warning(f"第 {line_num} 行 JSON 解析失败: {e}")
+                        continue
+                    language = instance.get('language', 'unknown')
+                    if not language:
+                        language = 'unknown'
+                    language = str(language).lower()
+
+                # 原样写出行字节，避免解码-再编码
+                _buffered_write(language, line if line.endswith(b'\n') else line + b'\n')
+                counts_by_language[language] += 1
                 total_count += 1
-            except json.JSONDecodeError as e:
-                logger.warning(f"第 {line_num} 行 JSON 解析失败: {e}")
-                continue
-    
+    finally:
+        for language, handle in handles.items():
+            buf, _ = buffers[language]
+            if buf:
+                handle.writelines(buf)
+            handle.close()
+
     logger.info(f"总共读取 {total_count} 个实例")
-    logger.info(f"发现 {len(instances_by_language)} 种语言: {list(instances_by_language.keys())}")
-    
-    # 为每种语言创建文件
-    input_basename = os.path.splitext(os.path.basename(input_file))[0]
-    
-    for language, instances in instances_by_language.items():
-        output_file = os.path.join(output_dir, f"{input_basename}_{language}.jsonl")
-        
-        logger.info(f"写入 {len(instances)} 个 {language} 实例到 {output_file}")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for instance in instances:
-                f.write(json.dumps(instance, ensure_ascii=False) + '\n')
-        
-        logger.info(f"✓ 已创建: {output_file} ({len(instances)} 个实例)")
-    
+    logger.info(f"发现 {len(counts_by_language)} 种语言: {list(counts_by_language.keys())}")
+
     # 打印统计信息
     logger.info("\n" + "=" * 60)
     logger.info("拆分统计")
     logger.info("=" * 60)
-    for language in sorted(instances_by_language.keys()):
-        count = len(instances_by_language[language])
-        logger.info(f"{language:15s}: {count:3d} 个实例")
-    
+    for language in sorted(counts_by_language.keys()):
+        logger.info(f"{language:15s}: {counts_by_language[language]:3d} 个实例")
+
     return 0
 
 
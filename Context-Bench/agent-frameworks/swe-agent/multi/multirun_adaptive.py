@@ -8,15 +8,18 @@
 
 from __future__ import annotations
 
+import atexit
+import functools
 import logging
 import json
 import os
+import queue
 import re
 import subprocess
 import traceback
 import time
 import threading
-import copy
+from types import MappingProxyType
 from typing import Any, Set, Dict
 from dataclasses import dataclass
 from getpass import getuser
@@ -25,6 +28,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import yaml
 import docker
+
+try:
+    import orjson  # bytes 原生的 JSON 序列化，预测记录写出更快
+except ImportError:  # 可选加速
+    orjson = None
 from rich.markdown import Markdown
 
 try:
@@ -54,10 +62,83 @@ INSTANCE_LOG_DIR = 'logs/'
 
 # 全局锁和状态管理
 _lock = threading.Lock()
-_running_images: Set[str] = set()  # 正在运行的镜像
-_completed_instances: Set[str] = set()  # 已完成的实例
-_failed_instances: Dict[str, str] = {}  # 失败的实例及原因
+# 状态变化通知：实例完成释放镜像时唤醒等待中的线程，代替定时轮询
+_state_cv = threading.Condition()
+
+# 共享状态按 hash(key) & 15 分成 16 个分片，每片一把锁：
+# 高并发下所有线程抢一把全局锁会把状态更新串行化
+_NUM_SHARDS = 16
+
+
+class _ShardedSet:
+    """分片加锁的字符串集合"""
+
+    def __init__(self):
+        self._locks = [threading.Lock() for _ in range(_NUM_SHARDS)]
+        self._shards = [set() for _ in range(_NUM_SHARDS)]
+
+    def _pick(self, key: str):
+        i = hash(key) & (_NUM_SHARDS - 1)
+        return self._locks[i], self._shards[i]
+
+    def add(self, key: str):
+        lock, shard = self._pick(key)
+        with lock:
+            shard.add(key)
+
+    def discard(self, key: str):
+        lock, shard = self._pick(key)
+        with lock:
+            shard.discard(key)
+
+    def __contains__(self, key: str) -> bool:
+        lock, shard = self._pick(key)
+        with lock:
+            return key in shard
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class _ShardedDict:
+    """分片加锁的字符串字典"""
+
+    def __init__(self):
+        self._locks = [threading.Lock() for _ in range(_NUM_SHARDS)]
+        self._shards = [dict() for _ in range(_NUM_SHARDS)]
+
+    def _pick(self, key: str):
+        i = hash(key) & (_NUM_SHARDS - 1)
+        return self._locks[i], self._shards[i]
+
+    def __setitem__(self, key: str, value: str):
+        lock, shard = self._pick(key)
+        with lock:
+            shard[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        lock, shard = self._pick(key)
+        with lock:
+            return key in shard
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def items(self) -> list:
+        out = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                out.extend(shard.items())
+        return out
+
+
+_running_images = _ShardedSet()  # 正在运行的镜像
+_completed_instances = _ShardedSet()  # 已完成的实例
+_failed_instances = _ShardedDict()  # 失败的实例及原因
 _skipped_count = 0  # 因冲突跳过的次数
+# 进度日志用的普通计数器：避免每次完成都对分片集合求和
+_success_ctr = 0
+_failure_ctr = 0
 
 
 def get_image_name_from_instance_id(instance_id: str, all_datas: dict) -> str:
@@ -78,73 +159,133 @@ def get_image_name_from_instance_id(instance_id: str, all_datas: dict) -> str:
     return instance_id
 
 
+# 复用的 docker 客户端（懒初始化；每次 from_env 都要重建 socket 连接并协商 API 版本）
+_docker_client = None
+_docker_client_lock = threading.Lock()
+
+
+def _get_docker_client(reset: bool = False):
+    """获取共享的 docker 客户端；reset=True 时重建（连接失效后重试用）"""
+    global _docker_client
+    with _docker_client_lock:
+        if reset:
+            _docker_client = None
+        if _docker_client is None:
+            _docker_client = docker.from_env(timeout=10)
+        return _docker_client
+
+
+def _list_containers() -> list:
+    """低层 API 列出运行中容器（返回 dict，避免构造完整 Container 对象）"""
+    try:
+        return _get_docker_client().api.containers(quiet=False)
+    except (docker.errors.APIError, ConnectionError):
+        # 连接失效时重建一次客户端再试
+        return _get_docker_client(reset=True).api.containers(quiet=False)
+
+
+# 容器列表的 TTL 快照：几十个工作线程各自轮询会把 docker 守护进程打爆，
+# 在 TTL 窗口内共享同一份快照即可（占用状态本来就只是尽力而为的判断）
+_DOCKER_POLL_TTL = float(os.environ.get("DOCKER_POLL_TTL", "1.5"))
+# 机器上只有本进程在跑实例时，内部状态已经足够判断占用，
+# 设置该标志可完全跳过 docker 容器枚举
+_TRUST_INTERNAL_TRACKING = os.environ.get("TRUST_INTERNAL_TRACKING", "").lower() in ("1", "true", "yes")
+_snapshot_lock = threading.Lock()
+_container_snapshot: tuple[float, frozenset, frozenset] = (0.0, frozenset(), frozenset())
+
+
+def _get_container_snapshot() -> tuple[frozenset, frozenset]:
+    """返回 (运行中镜像 tag 集合, 容器名集合)，过期后才真正请求 docker"""
+    global _container_snapshot
+    with _snapshot_lock:
+        expires_at, tags, names = _container_snapshot
+        now = time.monotonic()
+        if now < expires_at:
+            return tags, names
+        containers = _list_containers()
+        tags = frozenset(c.get("Image") or "" for c in containers) - {""}
+        names = frozenset(n.lstrip("/") for c in containers for n in (c.get("Names") or []))
+        _container_snapshot = (now + _DOCKER_POLL_TTL, tags, names)
+        return tags, names
+
+
 def is_image_in_use(image_name: str) -> bool:
     """检查镜像是否正在被使用（有运行中的容器）"""
     try:
-        client = docker.from_env(timeout=10)
-        containers = client.containers.list()
-        for container in containers:
-            if container.image.tags:
-                for tag in container.image.tags:
-                    if image_name in tag or tag in image_name:
-                        return True
-            # 也检查容器名是否包含镜像名的特征
-            container_name = container.name
-            image_sanitized = image_name.replace("/", "-").replace(":", "-")
-            if image_sanitized in container_name:
-                return True
-        return False
+        tags, names = _get_container_snapshot()
+        # 精确匹配：子串匹配会把 repo:pr-1 误判成 repo:pr-12 的占用，
+        # 而且要逐个 tag 扫描；frozenset 成员测试是 O(1)
+        if image_name in tags:
+            return True
+        # 也检查按约定从镜像名派生的容器名
+        return image_name.replace("/", "-").replace(":", "-") in names
     except Exception as e:
         logger.warning(f"检查镜像使用状态失败: {e}")
         return False  # 失败时假设不在使用
 
 
+# 实例 ID -> 镜像名 的预计算映射（main() 启动时填充一次；镜像名是纯函数，
+# 没必要在每次可用性检查/标记时都重新解析字符串）
+_image_name_map: Dict[str, str] = {}
+
+
+def _image_name_for(instance_id: str, all_datas: dict) -> str:
+    """优先查预计算映射，未命中（如测试直接调用）时回退到即时计算"""
+    image_name = _image_name_map.get(instance_id)
+    if image_name is None:
+        image_name = get_image_name_from_instance_id(instance_id, all_datas)
+    return image_name
+
+
 def is_instance_available(instance_id: str, all_datas: dict) -> bool:
     """检查实例是否可用（没有被占用）"""
     global _running_images, _completed_instances
     
-    with _lock:
-        # 已完成
-        if instance_id in _completed_instances:
-            return False
-        
-        # 已失败
-        if instance_id in _failed_instances:
-            return False
-    
+    # 已完成
+    if instance_id in _completed_instances:
+        return False
+
+    # 已失败
+    if instance_id in _failed_instances:
+        return False
+
     # 获取镜像名
-    image_name = get_image_name_from_instance_id(instance_id, all_datas)
-    
-    with _lock:
-        # 检查本进程是否正在使用这个镜像
-        if image_name in _running_images:
-            return False
-    
-    # 检查外部进程是否正在使用这个镜像
-    if is_image_in_use(image_name):
+    image_name = _image_name_for(instance_id, all_datas)
+
+    # 检查本进程是否正在使用这个镜像
+    if image_name in _running_images:
         return False
     
+    # 检查外部进程是否正在使用这个镜像（可信内部跟踪时省掉 docker 查询）
+    if not _TRUST_INTERNAL_TRACKING and is_image_in_use(image_name):
+        return False
+
     return True
 
 
 def mark_instance_running(instance_id: str, all_datas: dict):
     """标记实例为运行中"""
     global _running_images
-    image_name = get_image_name_from_instance_id(instance_id, all_datas)
-    with _lock:
-        _running_images.add(image_name)
+    image_name = _image_name_for(instance_id, all_datas)
+    _running_images.add(image_name)
 
 
 def mark_instance_done(instance_id: str, all_datas: dict, success: bool, error: str = ""):
     """标记实例为完成"""
-    global _running_images, _completed_instances, _failed_instances
-    image_name = get_image_name_from_instance_id(instance_id, all_datas)
-    with _lock:
-        _running_images.discard(image_name)
-        if success:
-            _completed_instances.add(instance_id)
-        else:
-            _failed_instances[instance_id] = error
+    global _running_images, _completed_instances, _failed_instances, _success_ctr, _failure_ctr
+    image_name = _image_name_for(instance_id, all_datas)
+    _running_images.discard(image_name)
+    if success:
+        _completed_instances.add(instance_id)
+        with _lock:
+            _success_ctr += 1
+    else:
+        _failed_instances[instance_id] = error
+        with _lock:
+            _failure_ctr += 1
+    # 镜像已释放，唤醒正在等待该镜像的线程
+    with _state_cv:
+        _state_cv.notify_all()
 
 
 @dataclass(frozen=True)
@@ -188,10 +329,79 @@ class ScriptArguments(FlattenedAccess, FrozenSerializable):
         )
 
 
+@functools.lru_cache(maxsize=256)
+def _summarize_patch(patch_text: str, include_added: bool = False) -> str:
+    """把补丁解析成 \"- path\" 列表文本；同一实例重试时不用重复解析大补丁"""
+    patch = PatchSet(patch_text)
+    files = list(patch.modified_files)
+    if include_added:
+        files += patch.added_files
+    return "\n".join(f"- {x.path}" for x in files)
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_filter(pattern: str) -> re.Pattern:
+    """缓存 instance_filter 的编译结果（ScriptArguments 是 frozen 的，只能挂在模块级）"""
+    return re.compile(pattern)
+
+
 class _ContinueLoop(Exception):
     pass
 
 
+class _PredWriter:
+    """后台写预测结果：工作线程只入队，单线程复用常驻的 append 句柄
+
+    原来每条预测都 open/close 一次 all_preds.jsonl，并在持有 GIL 的工作
+    线程里做同步写盘；改成排队后由后台线程顺序写出（append 模式 + 行缓冲，
+    每条记录仍然立即落盘）。
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def put(self, output_file: Path, datum: dict):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._drain, daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+        if orjson is not None:
+            line = orjson.dumps(datum) + b"\n"
+        else:
+            line = (json.dumps(datum) + "\n").encode()
+        self._queue.put((str(output_file), line))
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
+    def _drain(self):
+        handles: Dict[str, Any] = {}
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                path, line = item
+                fp = handles.get(path)
+                if fp is None:
+                    # 无缓冲 append：每条记录一次 write，立即落盘
+                    fp = open(path, "ab", buffering=0)
+                    handles[path] = fp
+                fp.write(line)
+        finally:
+            for fp in handles.values():
+                fp.close()
+
+
+_pred_writer = _PredWriter()
+
+
 class Main:
     def __init__(self, args: ScriptArguments, filter_instance: str):
         self.args = args
@@ -217,13 +427,13 @@ class Main:
             raise _ContinueLoop
 
         issue = getattr(self.env, "query", None)
-        files = []
+        # 统一为字符串（原来未命中分支留下的是 list）
+        files = ""
         if self.env.record.instance.pr.fix_patch:
-            files = "\n".join([f"- {x.path}" for x in PatchSet(self.env.record.instance.pr.fix_patch).modified_files])
-        test_files = []
+            files = _summarize_patch(self.env.record.instance.pr.fix_patch)
+        test_files = ""
         if self.env.record.instance.pr.test_patch:
-            test_patch_obj = PatchSet(self.env.record.instance.pr.test_patch)
-            test_files = "\n".join([f"- {x.path}" for x in test_patch_obj.modified_files + test_patch_obj.added_files])
+            test_files = _summarize_patch(self.env.record.instance.pr.test_patch, include_added=True)
         tests = ""
 
         setup_args = {"issue": issue, "files": files, "test_files": test_files, "tests": tests}
@@ -262,7 +472,7 @@ class Main:
             raise
 
     def should_skip(self, instance_id: str) -> bool:
-        if re.match(self.args.instance_filter, instance_id) is None:
+        if _compiled_filter(self.args.instance_filter).match(instance_id) is None:
             return True
         if not self.args.skip_existing:
             return False
@@ -286,8 +496,7 @@ class Main:
             KEY_INSTANCE_ID: instance_id,
             KEY_PREDICTION: model_patch,
         }
-        with open(output_file, "a+") as fp:
-            print(json.dumps(datum), file=fp, flush=True)
+        _pred_writer.put(output_file, datum)
         logger.info(f"Saved predictions to {output_file}")
 
     def _save_patch(self, instance_id: str, info):
@@ -355,15 +564,26 @@ def run_single_adaptive(scripts, instance_id: str, all_datas: dict, max_retries:
             with _lock:
                 _skipped_count += 1
             logger.info(f"⏳ 实例 {instance_id} 被占用，跳过 (attempt {attempt + 1})")
-            time.sleep(2)  # 等待一下再检查
+            # 等待镜像真正空闲：本进程释放时会 notify 提前唤醒；
+            # 外部进程占用时谓词为假，靠超时兜底退避（快照带 TTL，
+            # 谓词重查时才会再请求 docker，不会打爆 docker ps）
+            image_name = _image_name_for(instance_id, all_datas)
+
+            def _image_free() -> bool:
+                if image_name in _running_images:
+                    return False
+                return _TRUST_INTERNAL_TRACKING or not is_image_in_use(image_name)
+
+            with _state_cv:
+                _state_cv.wait_for(_image_free, timeout=5.0)
             continue
         
         # 标记为运行中
         mark_instance_running(instance_id, all_datas)
         
         try:
-            copy_args = copy.deepcopy(scripts)
-            handler = Main(copy_args, instance_id)
+            # ScriptArguments 是 frozen dataclass，线程间共享同一份即可，不需要 deepcopy
+            handler = Main(scripts, instance_id)
             handler.main()
             mark_instance_done(instance_id, all_datas, success=True)
             logger.info(f"✅ 完成实例 {instance_id}")
@@ -378,7 +598,8 @@ def run_single_adaptive(scripts, instance_id: str, all_datas: dict, max_retries:
             if "container" in error_msg.lower() or "conflict" in error_msg.lower():
                 mark_instance_done(instance_id, all_datas, success=False, error="conflict")
                 logger.warning(f"🔄 实例 {instance_id} 遇到容器冲突，将重试")
-                time.sleep(5)
+                with _state_cv:
+                    _state_cv.wait(timeout=5.0)
                 continue
             else:
                 mark_instance_done(instance_id, all_datas, success=False, error=error_msg[:100])
@@ -405,6 +626,12 @@ def main(args: ScriptArguments):
     instance_ids = list(all_datas.keys())
     total_instances = len(instance_ids)
     logger.info(f"📊 总实例数: {total_instances}")
+
+    # 一次性预计算所有实例的镜像名，后续检查/标记只做字典查找
+    global _image_name_map
+    _image_name_map = MappingProxyType(
+        {instance_id: get_image_name_from_instance_id(instance_id, all_datas) for instance_id in instance_ids}
+    )
     
     post_args = parse(
         ScriptArguments,
@@ -421,28 +648,30 @@ def main(args: ScriptArguments):
         for instance_id in instance_ids
     }
     
-    # 定期打印进度
+    # 定期打印进度（每完成约 1% 打一条，避免日志刷屏）
     start_time = time.time()
     completed = 0
-    
+    log_every = max(1, total_instances // 100)
+
     for future in as_completed(futures):
         instance_id = futures[future]
         try:
             result = future.result()
             completed += 1
-            elapsed = time.time() - start_time
-            remaining = total_instances - completed
-            rate = completed / elapsed if elapsed > 0 else 0
-            eta = remaining / rate if rate > 0 else 0
-            
-            logger.info(
-                f"📈 进度: {completed}/{total_instances} "
-                f"({100*completed/total_instances:.1f}%) "
-                f"| 成功: {len(_completed_instances)} "
-                f"| 失败: {len(_failed_instances)} "
-                f"| 跳过: {_skipped_count} "
-                f"| ETA: {eta/60:.1f}min"
-            )
+            if completed % log_every == 0 or completed == total_instances:
+                elapsed = time.time() - start_time
+                remaining = total_instances - completed
+                rate = completed / elapsed if elapsed > 0 else 0
+                eta = remaining / rate if rate > 0 else 0
+
+                logger.info(
+                    f"📈 进度: {completed}/{total_instances} "
+                    f"({100*completed/total_instances:.1f}%) "
+                    f"| 成功: {_success_ctr} "
+                    f"| 失败: {_failure_ctr} "
+                    f"| 跳过: {_skipped_count} "
+                    f"| ETA: {eta/60:.1f}min"
+                )
         except Exception as e:
             logger.error(f"❌ 实例 {instance_id} 异常: {e}")
     
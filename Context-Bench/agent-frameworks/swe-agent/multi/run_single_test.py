@@ -20,12 +20,6 @@ os.chdir("/home/lih/sweagent-eval/MSWE-agent")
 sys.path.insert(0, "/home/lih/sweagent-eval/MSWE-agent")
 
 from pathlib import Path
-from sweagent import CONFIG_DIR
-from sweagent.agent.agents import AgentArguments
-from sweagent.agent.models import ModelArguments
-from sweagent.environment.swe_env import EnvironmentArguments
-from multi_swe_bench.harness.build_dataset import CliArgs
-from run import ScriptArguments, ActionsArguments, Main
 
 
 def main():
@@ -41,7 +35,16 @@ def main():
     parser.add_argument("--cost_limit", type=float, default=3.0,
                        help="Per instance cost limit")
     args = parser.parse_args()
-    
+
+    # 重量级依赖（docker/rich/simple_parsing 等都在 sweagent 的导入链上）
+    # 延后到参数解析之后再加载，--help 和参数错误就不用等好几秒了
+    from sweagent import CONFIG_DIR
+    from sweagent.agent.agents import AgentArguments
+    from sweagent.agent.models import ModelArguments
+    from sweagent.environment.swe_env import EnvironmentArguments
+    from multi_swe_bench.harness.build_dataset import CliArgs
+    from run import ScriptArguments, ActionsArguments, Main
+
     # 如果指定了 deployment，更新环境变量
     if args.deployment:
         os.environ["AZURE_OPENAI_DEPLOYMENT"] = args.deployment
@@ -8,6 +8,20 @@ import json
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson  # optional: much faster parse/serialize for large trajectories
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # optional: vectorized range merging for long trajectories
+except ImportError:
+    np = None
+
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 
 class ContextExtractor:
     """Extract and save context information from agent trajectories"""
@@ -16,6 +30,15 @@ class ContextExtractor:
         # Patterns to match file viewing commands
         self.open_pattern = re.compile(r'open\s+["\']?([^"\'>\s]+)["\']?')
         self.cat_pattern = re.compile(r'cat\s+["\']?([^"\'>\s|]+)["\']?')
+        # Single alternation over all tracked commands: one scan per action
+        # instead of one search per pattern, dispatched on lastgroup
+        self.action_pattern = re.compile(
+            r'open\s+["\']?(?P<open>[^"\'>\s]+)["\']?'
+            r'|cat\s+["\']?(?P<cat>[^"\'>\s|]+)["\']?'
+            r'|edit\s+(?P<edit_start>\d+):(?P<edit_end>\d+)'
+            r'|goto\s+(?P<goto>\d+)'
+        )
+        self.file_obs_pattern = re.compile(r'\[File:\s*([^\]]+)\s*\(')
         self.head_pattern = re.compile(r'head\s+(?:-n\s+\d+\s+)?["\']?([^"\'>\s|]+)["\']?')
         self.tail_pattern = re.compile(r'tail\s+(?:-n\s+\d+\s+)?["\']?([^"\'>\s|]+)["\']?')
         self.sed_pattern = re.compile(r'sed\s+.*["\']?([^"\'>\s]+)["\']?')
@@ -47,49 +70,41 @@ class ContextExtractor:
             observation = step.get('observation', '')
             response = step.get('response', '')
             
-            # Extract PATCH_CONTEXT from response
-            match = self.patch_context_pattern.search(response)
-            if match:
-                patch_context = match.group(1).strip()
-            
-            # Track file operations
-            # Open command
-            open_match = self.open_pattern.search(action)
-            if open_match:
-                current_file = open_match.group(1)
-                viewed_files.add(current_file)
-                if current_file not in file_line_ranges:
-                    file_line_ranges[current_file] = []
-            
-            # Cat command
-            cat_match = self.cat_pattern.search(action)
-            if cat_match:
-                viewed_files.add(cat_match.group(1))
-            
-            # Edit command
-            edit_match = self.edit_pattern.search(action)
-            if edit_match and current_file:
-                start_line = int(edit_match.group(1))
-                end_line = int(edit_match.group(2))
-                edited_files.add(current_file)
-                file_line_ranges.setdefault(current_file, []).append({
-                    'start': start_line,
-                    'end': end_line,
-                    'type': 'edit'
-                })
-            
-            # Goto command
-            goto_match = self.goto_pattern.search(action)
-            if goto_match and current_file:
-                line_num = int(goto_match.group(1))
-                file_line_ranges.setdefault(current_file, []).append({
-                    'start': max(1, line_num - 50),
-                    'end': line_num + 50,
-                    'type': 'view'
-                })
+            # Extract PATCH_CONTEXT from response; the DOTALL search is
+            # expensive on long responses, so gate it behind a substring
+            # check and stop once a block has been found
+            if patch_context is None and '<PATCH_CONTEXT>' in response:
+                match = self.patch_context_pattern.search(response)
+                if match:
+                    patch_context = match.group(1).strip()
             
+            # Track file operations: one combined scan, dispatch on group name
+            for m in self.action_pattern.finditer(action):
+                kind = m.lastgroup
+                if kind == 'open':
+                    current_file = m.group('open')
+                    viewed_files.add(current_file)
+                    if current_file not in file_line_ranges:
+                        file_line_ranges[current_file] = []
+                elif kind == 'cat':
+                    viewed_files.add(m.group('cat'))
+                elif kind == 'edit_end' and current_file:
+                    edited_files.add(current_file)
+                    file_line_ranges.setdefault(current_file, []).append({
+                        'start': int(m.group('edit_start')),
+                        'end': int(m.group('edit_end')),
+                        'type': 'edit'
+                    })
+                elif kind == 'goto' and current_file:
+                    line_num = int(m.group('goto'))
+                    file_line_ranges.setdefault(current_file, []).append({
+                        'start': max(1, line_num - 50),
+                        'end': line_num + 50,
+                        'type': 'view'
+                    })
+
             # Extract current file from observation
-            file_match = re.search(r'\[File:\s*([^\]]+)\s*\(', observation)
+            file_match = self.file_obs_pattern.search(observation)
             if file_match:
                 current_file = file_match.group(1).strip()
                 viewed_files.add(current_file)
@@ -99,8 +114,9 @@ class ContextExtractor:
             file_line_ranges[file_path] = self._merge_ranges(file_line_ranges[file_path])
         
         return {
-            'viewed_files': list(viewed_files),
-            'edited_files': list(edited_files),
+            # Sorted so output is deterministic and cache/diff friendly
+            'viewed_files': sorted(viewed_files),
+            'edited_files': sorted(edited_files),
             'file_line_ranges': file_line_ranges,
             'patch_context': patch_context,
             'patch_context_parsed': self._parse_patch_context(patch_context) if patch_context else None,
@@ -110,7 +126,35 @@ class ContextExtractor:
         """Merge overlapping line ranges"""
         if not ranges:
             return []
-        
+        if np is not None and len(ranges) >= 32:
+            return self._merge_ranges_np(ranges)
+        return self._merge_ranges_py(ranges)
+
+    def _merge_ranges_np(self, ranges: list[dict]) -> list[dict]:
+        """Vectorized merge: sort columns, running-max the ends, split on gaps"""
+        starts = np.array([r['start'] for r in ranges])
+        ends = np.array([r['end'] for r in ranges])
+        edits = np.array([r.get('type') == 'edit' for r in ranges])
+        types = [r.get('type') for r in ranges]
+
+        order = np.argsort(starts, kind='stable')
+        starts, ends, edits = starts[order], ends[order], edits[order]
+        run_max = np.maximum.accumulate(ends)
+        # A new group begins wherever a start exceeds the furthest end so far + 1
+        breaks = np.flatnonzero(starts[1:] > run_max[:-1] + 1) + 1
+        group_bounds = zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(starts)])))
+
+        return [
+            {
+                'start': int(starts[a]),
+                'end': int(run_max[b - 1]),
+                'type': 'edit' if edits[a:b].any() else types[order[a]],
+            }
+            for a, b in group_bounds
+        ]
+
+    def _merge_ranges_py(self, ranges: list[dict]) -> list[dict]:
+        """Plain-Python merge, cheaper than array setup for short lists"""
         # Sort by start line
         sorted_ranges = sorted(ranges, key=lambda x: x['start'])
         merged = [sorted_ranges[0]]
@@ -152,23 +196,53 @@ class ContextExtractor:
     
     def save_context(self, context: dict, output_path: Path) -> None:
         """Save extracted context to a JSON file"""
-        output_path.write_text(json.dumps(context, indent=2))
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(context, option=orjson.OPT_INDENT_2))
+        else:
+            output_path.write_text(json.dumps(context, indent=2))
+
+
+def _cache_path_for(traj_path: Path) -> Path:
+    """Cache file keyed by trajectory name, mtime and size"""
+    st = traj_path.stat()
+    return traj_path.parent / '.context_cache' / f'{traj_path.stem}.{st.st_mtime_ns}.{st.st_size}.json'
 
 
 def extract_context_from_traj_file(traj_path: Path) -> dict:
-    """Extract context from a trajectory file"""
+    """Extract context from a trajectory file
+
+    Results are memoized on disk under a .context_cache/ directory next to
+    the trajectory, keyed by mtime and size, so repeated extraction runs
+    over an unchanged trajectory skip the JSON parse and regex scan.
+    """
+    try:
+        cache_path = _cache_path_for(traj_path)
+        if cache_path.exists():
+            return _json_loads(cache_path.read_bytes())
+    except OSError:
+        cache_path = None
+
     extractor = ContextExtractor()
-    
-    with open(traj_path, 'r') as f:
-        traj_data = json.load(f)
-    
+
+    traj_data = _json_loads(traj_path.read_bytes())
+
     trajectory = traj_data.get('trajectory', [])
     context = extractor.extract_from_trajectory(trajectory)
-    
+
     # Add metadata
     context['instance_id'] = traj_data.get('environment', '')
     context['info'] = traj_data.get('info', {})
-    
+
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            if orjson is not None:
+                cache_path.write_bytes(orjson.dumps(context))
+            else:
+                cache_path.write_text(json.dumps(context))
+        except OSError:
+            pass  # caching is best-effort
+
     return context
 
 
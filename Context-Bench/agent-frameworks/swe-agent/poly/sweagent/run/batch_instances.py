@@ -1,3 +1,4 @@
+import functools
 import json
 import random
 import re
@@ -14,6 +15,11 @@ from swerex.deployment.config import (
 )
 from typing_extensions import Self
 
+try:
+    import orjson  # optional: faster parsing for embedded image assets and overrides
+except ImportError:
+    orjson = None
+
 from sweagent.agent.problem_statement import (
     ProblemStatementConfig,
     SWEBenchMultimodalProblemStatement,
@@ -29,6 +35,189 @@ logger = get_logger("swea-config", emoji="🔧")
 # Global flag to ensure we only patch DockerDeployment once
 _swerex_patched = False
 
+# Translation table built once; str.translate avoids re-scanning per instance
+_DASH_TABLE = str.maketrans({"_": "-"})
+
+# Shared read-only sentinel for the common no-extra-fields case; never mutate
+_EMPTY: dict[str, Any] = {}
+
+
+def _loads(data: bytes | str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _classify_repo(repo_name: str) -> str:
+    """Classify `repo_name` with a single pass of early-exit string checks."""
+    if not repo_name:
+        return "none"
+    if "github" in repo_name:
+        return "github"
+    if "/" not in repo_name:
+        return "preexisting"
+    return "local"
+
+
+# Repo-config constructors keyed by classification, built once at import time
+_REPO_CTORS = {
+    "none": lambda name, commit: None,
+    "github": lambda name, commit: GithubRepoConfig(github_url=name, base_commit=commit),
+    "preexisting": lambda name, commit: PreExistingRepoConfig(repo_name=name, base_commit=commit),
+    "local": lambda name, commit: LocalRepoConfig(path=Path(name), base_commit=commit),
+}
+
+
+# Candidate locations for image_overrides.json, resolved once at import time
+# instead of rebuilding the Path chains on every get_instance_configs call
+_HERE = Path(__file__).resolve().parent
+_IMAGE_OVERRIDE_PATHS = (
+    _HERE.parent.parent.parent / "image_overrides.json",  # From sweagent-eval root
+    _HERE.parent.parent / "image_overrides.json",  # From SWE-agent root
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _image_overrides() -> dict[str, str]:
+    """Load instance-id -> image-name overrides, parsed once per process.
+
+    The current-working-directory candidate is resolved lazily since cwd is
+    not known at import time.
+    """
+    for override_file in (*_IMAGE_OVERRIDE_PATHS, Path.cwd() / "image_overrides.json"):
+        if override_file.exists():
+            try:
+                # Feed bytes straight to the parser, skipping the text decode round trip
+                image_overrides = _loads(override_file.read_bytes())
+                logger.debug(f"Loaded {len(image_overrides)} image overrides from {override_file}")
+                return image_overrides
+            except Exception as e:
+                logger.warning(f"Failed to load image overrides from {override_file}: {e}")
+    return {}
+
+@functools.lru_cache(maxsize=1)
+def _local_docker_images() -> frozenset[str]:
+    """List locally available image tags with a single docker invocation.
+
+    每个实例各跑一次 docker image inspect 意味着 N 次 fork + N 次 daemon RPC；
+    一次 docker images 列表换成 O(1) 的集合查询。
+    """
+    import subprocess
+
+    try:
+        result = subprocess.run(
+            ["docker", "images", "--format", "{{.Repository}}:{{.Tag}}", "--no-trunc"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=False,
+        )
+        if result.returncode == 0:
+            return frozenset(result.stdout.split())
+    except Exception:
+        pass  # 如果列表失败，当作没有本地镜像
+    return frozenset()
+
+
+def _patched_image_exists(image_name: str) -> bool:
+    """Check whether an image exists locally (one bulk listing, then set membership)."""
+    return image_name in _local_docker_images()
+
+
+def _ensure_swerex_patched() -> None:
+    """Monkey-patch swerex's Docker deployment startup command, once per process.
+
+    For Multi-SWE-bench images, we need to ensure Python 3.10+ is available
+    for swe-rex installation. The swerex library will try to install swe-rex
+    using python3 (which is 3.8), but swe-rex requires Python >= 3.10.
+
+    Solution: We'll monkey-patch swerex's Docker deployment to use a custom
+    startup command that installs Python 3.10+ and swe-rex before starting.
+    This is done by patching the _get_swerex_start_cmd method in swerex.deployment.docker.
+
+    This used to live inside the per-instance conversion hot path; it is called
+    once per batch instead so the loop body stays small.
+    """
+    global _swerex_patched
+    if _swerex_patched:
+        return
+    try:
+        from swerex.deployment.docker import DockerDeployment
+
+        original_get_swerex_start_cmd = DockerDeployment._get_swerex_start_cmd
+
+        def patched_get_swerex_start_cmd(self, token: str) -> list[str]:
+            """Patched version that installs Python 3.10+ and swe-rex for Multi-SWE-bench images."""
+            if self._config.image and self._config.image.startswith("mswebench/"):
+                # Custom startup command for Multi-SWE-bench images
+                rex_args = f"--auth-token {token}"
+                install_cmd = """
+                if ! command -v swerex-remote >/dev/null 2>&1; then
+                    # Try to find Python 3.10+
+                    PYTHON_CMD=""
+                    for py in python3.11 python3.10 python3.12 python3; do
+                        if command -v $py >/dev/null 2>&1; then
+                            PYTHON_CMD=$py
+                            break
+                        fi
+                    done
+
+                    # If not found, try to install Python 3.10
+                    if [ -z "$PYTHON_CMD" ] && [ -f /etc/debian_version ]; then
+                        apt-get update -qq >/dev/null 2>&1 && \
+                        apt-get install -y -qq software-properties-common >/dev/null 2>&1 && \
+                        add-apt-repository -y ppa:deadsnakes/ppa >/dev/null 2>&1 && \
+                        apt-get update -qq >/dev/null 2>&1 && \
+                        apt-get install -y -qq python3.10 python3.10-venv python3.10-dev >/dev/null 2>&1 && \
+                        PYTHON_CMD=python3.10 || true
+                    fi
+
+                    # Install swe-rex using the found Python
+                    if [ -n "$PYTHON_CMD" ]; then
+                        $PYTHON_CMD -m venv /root/venv_swe >/dev/null 2>&1 || true
+                        /root/venv_swe/bin/pip install --quiet --upgrade pip >/dev/null 2>&1 || true
+                        # Try to install swe-rex and verify installation
+                        INSTALLED=0
+                        if /root/venv_swe/bin/pip install --quiet swe-rex >/dev/null 2>&1 && \
+                           /root/venv_swe/bin/python -c "import swerex" >/dev/null 2>&1; then
+                            INSTALLED=1
+                        elif /root/venv_swe/bin/pip install --quiet git+https://github.com/SWE-agent/SWE-ReX.git >/dev/null 2>&1 && \
+                             /root/venv_swe/bin/python -c "import swerex" >/dev/null 2>&1; then
+                            INSTALLED=1
+                        fi
+
+                        if [ $INSTALLED -eq 1 ]; then
+                            # Verify and create swerex-remote if it exists in venv
+                            if [ -f /root/venv_swe/bin/swerex-remote ]; then
+                                ln -sf /root/venv_swe/bin/swerex-remote /usr/local/bin/swerex-remote >/dev/null 2>&1 || true
+                            else
+                                # Create wrapper script using venv python
+                                cat > /usr/local/bin/swerex-remote << 'EOFWRAP'
+#!/bin/sh
+exec /root/venv_swe/bin/python -m swerex.runtime.remote "$@"
+EOFWRAP
+                                chmod +x /usr/local/bin/swerex-remote >/dev/null 2>&1 || true
+                            fi
+                        fi
+                    fi
+                fi
+                """
+                # Combine install command with swerex-remote startup
+                # Try swerex-remote command first, fallback to venv python, then system python
+                venv_python_fallback = f"/root/venv_swe/bin/python -m swerex.runtime.remote {rex_args}"
+                system_python_fallback = f"python3 -m pip install --break-system-packages --quiet swe-rex >/dev/null 2>&1 && python3 -m swerex.runtime.remote {rex_args}"
+                cmd = f"{install_cmd.strip()} && (command -v swerex-remote >/dev/null 2>&1 && swerex-remote {rex_args} || ([ -f /root/venv_swe/bin/python ] && /root/venv_swe/bin/python -c 'import swerex' >/dev/null 2>&1 && {venv_python_fallback} || {system_python_fallback}))"
+                return ["/bin/sh", "-c", cmd]
+            else:
+                # Use original method for other images
+                return original_get_swerex_start_cmd(self, token)
+
+        # Apply the patch
+        DockerDeployment._get_swerex_start_cmd = patched_get_swerex_start_cmd
+        _swerex_patched = True
+        logger.debug("Patched DockerDeployment._get_swerex_start_cmd for Multi-SWE-bench images")
+    except Exception as e:
+        logger.warning(f"Failed to patch DockerDeployment for Multi-SWE-bench: {e}")
+        # Continue without patch - will likely fail but at least we tried
+
 
 class AbstractInstanceSource(ABC):
     """Anything that adheres to this standard can be used to load instances."""
@@ -40,12 +229,30 @@ class AbstractInstanceSource(ABC):
 class BatchInstance(BaseModel):
     """A single instance in a batch of instances.
     This specifies both the environment configuration and the problem statement.
+
+    Note on memory: this stays a pydantic model (no __slots__/dataclass
+    conversion) because `ExpertInstancesFromFile` validates raw dicts through
+    `model_validate` and the run configs (de)serialize it. Per-batch memory is
+    kept down instead by filtering raw rows before construction and by not
+    retaining intermediate `SimpleBatchInstance` lists.
     """
 
     env: EnvironmentConfig
     problem_statement: ProblemStatementConfig
 
+    @classmethod
+    def from_swe_bench_dict(cls, instance: dict[str, Any], deployment: DeploymentConfig) -> "BatchInstance":
+        """Build a `BatchInstance` straight from a raw SWE-bench dataset row.
+
+        The resolved field values already have the right types, so the
+        intermediate `SimpleBatchInstance` is assembled with `model_construct`,
+        skipping a full validation pass per row.
+        """
+        simple = SimpleBatchInstance.model_construct(**SimpleBatchInstance._fields_from_swe_bench(instance))
+        return simple.to_full_batch_instance(deployment)
+
 
+@functools.lru_cache(maxsize=32)
 def _slice_spec_to_slice(slice_spec: str) -> slice:
     if slice_spec == "":
         return slice(None)
@@ -69,14 +276,20 @@ def _filter_batch_items(
     instances: list[BatchInstance], *, filter_: str, slice_: str = "", shuffle: bool = False
 ) -> list[BatchInstance]:
     if shuffle:
-        instances = sorted(instances.copy(), key=lambda x: x.problem_statement.id)
-        random.seed(42)
-        random.shuffle(instances)
+        # Shuffle an index permutation keyed by id instead of sorting the heavy
+        # model objects twice; a local Random keeps global RNG state untouched
+        order = sorted(range(len(instances)), key=lambda i: instances[i].problem_statement.id)
+        random.Random(42).shuffle(order)
+        instances = [instances[i] for i in order]
     before_filter = len(instances)
-    instances = [instance for instance in instances if re.match(filter_, instance.problem_statement.id)]
-    after_filter = len(instances)
-    if before_filter != after_filter:
-        logger.info("Instance filter: %d -> %d instances", before_filter, after_filter)
+    # Skip the regex pass entirely for the match-everything default filter
+    if filter_ and filter_ != ".*":
+        # Compile once instead of paying re's cache lookup per instance
+        pat = re.compile(filter_)
+        instances = [instance for instance in instances if pat.match(instance.problem_statement.id)]
+        after_filter = len(instances)
+        if before_filter != after_filter:
+            logger.info("Instance filter: %d -> %d instances", before_filter, after_filter)
     if slice_:
         instances = instances[_slice_spec_to_slice(slice_)]
         after_slice = len(instances)
@@ -114,8 +327,10 @@ class SimpleBatchInstance(BaseModel):
 
     def to_full_batch_instance(self, deployment: DeploymentConfig) -> BatchInstance:
         """Merge the deployment options into the `SimpleBatchInstance` object to get a full `BatchInstance`."""
-        # Very important: Make a copy of the deployment config because it will be shared among instances!!!
-        deployment = deployment.model_copy(deep=True)
+        # Very important: The deployment config is shared among instances, so we only ever
+        # hand out copies. Only scalar fields (image, python_standalone_dir) are overridden
+        # per instance, so a shallow model_copy(update=...) suffices — deep-copying the whole
+        # nested config tree per instance is needlessly expensive on large batches.
 
         if "issue_images" in self.extra_fields:
             problem_statement = SWEBenchMultimodalProblemStatement(
@@ -124,149 +339,51 @@ class SimpleBatchInstance(BaseModel):
                 id=self.instance_id,
                 extra_fields=self.extra_fields,
             )
+        elif not self.extra_fields:
+            # Trusted fast path: the fields are plain strings we just resolved,
+            # so skip the validation pass and reuse the shared empty dict
+            problem_statement = TextProblemStatement.model_construct(
+                text=self.problem_statement, id=self.instance_id, extra_fields=_EMPTY
+            )
         else:
             problem_statement = TextProblemStatement(
                 text=self.problem_statement, id=self.instance_id, extra_fields=self.extra_fields
             )
 
-        if not self.repo_name:
-            repo = None
-        elif "github" in self.repo_name:
-            repo = GithubRepoConfig(github_url=self.repo_name, base_commit=self.base_commit)
-        elif "/" not in self.repo_name:
-            repo = PreExistingRepoConfig(repo_name=self.repo_name, base_commit=self.base_commit)
-        else:
-            repo = LocalRepoConfig(path=Path(self.repo_name), base_commit=self.base_commit)
+        repo = _REPO_CTORS[_classify_repo(self.repo_name)](self.repo_name, self.base_commit)
         if isinstance(deployment, LocalDeploymentConfig):
             if self.image_name:
                 msg = "Local deployment does not support image_name"
                 raise ValueError(msg)
             return BatchInstance(
-                env=EnvironmentConfig(deployment=deployment, repo=repo), problem_statement=problem_statement
+                env=EnvironmentConfig(deployment=deployment.model_copy(), repo=repo),
+                problem_statement=problem_statement,
             )
         if isinstance(deployment, DummyDeploymentConfig):
             return BatchInstance(
-                env=EnvironmentConfig(deployment=deployment, repo=repo), problem_statement=problem_statement
+                env=EnvironmentConfig(deployment=deployment.model_copy(), repo=repo),
+                problem_statement=problem_statement,
             )
 
         # 检查是否有 patched 镜像（优先使用）
         image_name = self.image_name
         if image_name and not image_name.endswith("-patched") and image_name.startswith("mswebench/"):
             patched_image_name = f"{image_name}-patched"
-            import subprocess
-            try:
-                result = subprocess.run(
-                    ["docker", "image", "inspect", patched_image_name],
-                    capture_output=True,
-                    timeout=2,
-                    check=False
-                )
-                if result.returncode == 0:
-                    image_name = patched_image_name
-            except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
-                pass  # 如果检查失败，使用原始镜像名
-        
-        deployment.image = image_name  # type: ignore
+            if _patched_image_exists(patched_image_name):
+                image_name = patched_image_name
+
+        update: dict[str, Any] = {"image": image_name}
 
         if isinstance(deployment, DockerDeploymentConfig):
             # Normalize empty string to None so standalone Python build is disabled.
-            if deployment.python_standalone_dir == "":
-                deployment.python_standalone_dir = None  # type: ignore
-            if deployment.python_standalone_dir is None:
-                # For Multi-SWE-bench images (mswebench/*), disable standalone Python
-                # as these images may not support building standalone Python
-                if image_name and image_name.startswith("mswebench/"):
-                    deployment.python_standalone_dir = None  # type: ignore
-                # For Multi-SWE-bench images, we need to ensure Python 3.10+ is available
-                # for swe-rex installation. The swerex library will try to install swe-rex
-                # using python3 (which is 3.8), but swe-rex requires Python >= 3.10.
-                # 
-                # Solution: We'll monkey-patch swerex's Docker deployment to use a custom
-                # startup command that installs Python 3.10+ and swe-rex before starting.
-                # This is done by patching the _get_swerex_start_cmd method in swerex.deployment.docker
-                global _swerex_patched
-                if not _swerex_patched:
-                    try:
-                        from swerex.deployment.docker import DockerDeployment
-                        from swerex import REMOTE_EXECUTABLE_NAME, PACKAGE_NAME
-                        original_get_swerex_start_cmd = DockerDeployment._get_swerex_start_cmd
-                        
-                        def patched_get_swerex_start_cmd(self, token: str) -> list[str]:
-                            """Patched version that installs Python 3.10+ and swe-rex for Multi-SWE-bench images."""
-                            if self._config.image and self._config.image.startswith("mswebench/"):
-                                # Custom startup command for Multi-SWE-bench images
-                                rex_args = f"--auth-token {token}"
-                                install_cmd = """
-                                if ! command -v swerex-remote >/dev/null 2>&1; then
-                                    # Try to find Python 3.10+
-                                    PYTHON_CMD=""
-                                    for py in python3.11 python3.10 python3.12 python3; do
-                                        if command -v $py >/dev/null 2>&1; then
-                                            PYTHON_CMD=$py
-                                            break
-                                        fi
-                                    done
-                                    
-                                    # If not found, try to install Python 3.10
-                                    if [ -z "$PYTHON_CMD" ] && [ -f /etc/debian_version ]; then
-                                        apt-get update -qq >/dev/null 2>&1 && \
-                                        apt-get install -y -qq software-properties-common >/dev/null 2>&1 && \
-                                        add-apt-repository -y ppa:deadsnakes/ppa >/dev/null 2>&1 && \
-                                        apt-get update -qq >/dev/null 2>&1 && \
-                                        apt-get install -y -qq python3.10 python3.10-venv python3.10-dev >/dev/null 2>&1 && \
-                                        PYTHON_CMD=python3.10 || true
-                                    fi
-                                    
-                                    # Install swe-rex using the found Python
-                                    if [ -n "$PYTHON_CMD" ]; then
-                                        $PYTHON_CMD -m venv /root/venv_swe >/dev/null 2>&1 || true
-                                        /root/venv_swe/bin/pip install --quiet --upgrade pip >/dev/null 2>&1 || true
-                                        # Try to install swe-rex and verify installation
-                                        INSTALLED=0
-                                        if /root/venv_swe/bin/pip install --quiet swe-rex >/dev/null 2>&1 && \
-                                           /root/venv_swe/bin/python -c "import swerex" >/dev/null 2>&1; then
-                                            INSTALLED=1
-                                        elif /root/venv_swe/bin/pip install --quiet git+https://github.com/SWE-agent/SWE-ReX.git >/dev/null 2>&1 && \
-                                             /root/venv_swe/bin/python -c "import swerex" >/dev/null 2>&1; then
-                                            INSTALLED=1
-                                        fi
-                                        
-                                        if [ $INSTALLED -eq 1 ]; then
-                                            # Verify and create swerex-remote if it exists in venv
-                                            if [ -f /root/venv_swe/bin/swerex-remote ]; then
-                                                ln -sf /root/venv_swe/bin/swerex-remote /usr/local/bin/swerex-remote >/dev/null 2>&1 || true
-                                            else
-                                                # Create wrapper script using venv python
-                                                cat > /usr/local/bin/swerex-remote << 'EOFWRAP'
-#!/bin/sh
-exec /root/venv_swe/bin/python -m swerex.runtime.remote "$@"
-EOFWRAP
-                                                chmod +x /usr/local/bin/swerex-remote >/dev/null 2>&1 || true
-                                            fi
-                                        fi
-                                    fi
-                                fi
-                                """
-                                # Combine install command with swerex-remote startup
-                                # Try swerex-remote command first, fallback to venv python, then system python
-                                venv_python_fallback = f"/root/venv_swe/bin/python -m swerex.runtime.remote {rex_args}"
-                                system_python_fallback = f"python3 -m pip install --break-system-packages --quiet swe-rex >/dev/null 2>&1 && python3 -m swerex.runtime.remote {rex_args}"
-                                cmd = f"{install_cmd.strip()} && (command -v swerex-remote >/dev/null 2>&1 && swerex-remote {rex_args} || ([ -f /root/venv_swe/bin/python ] && /root/venv_swe/bin/python -c 'import swerex' >/dev/null 2>&1 && {venv_python_fallback} || {system_python_fallback}))"
-                                return ["/bin/sh", "-c", cmd]
-                            else:
-                                # Use original method for other images
-                                return original_get_swerex_start_cmd(self, token)
-                        
-                        # Apply the patch
-                        DockerDeployment._get_swerex_start_cmd = patched_get_swerex_start_cmd
-                        _swerex_patched = True
-                        logger.debug("Patched DockerDeployment._get_swerex_start_cmd for Multi-SWE-bench images")
-                    except Exception as e:
-                        logger.warning(f"Failed to patch DockerDeployment for Multi-SWE-bench: {e}")
-                        # Continue without patch - will likely fail but at least we tried
-            else:
-                # Note: you can disable this by setting python_standalone_dir to null or ""
-                deployment.python_standalone_dir = "/root"  # type: ignore
+            # For Multi-SWE-bench images (mswebench/*), standalone Python stays disabled
+            # as these images may not support building standalone Python.
+            # Note: you can disable this by setting python_standalone_dir to null or ""
+            update["python_standalone_dir"] = "/root" if deployment.python_standalone_dir else None
+
+        # Shallow copy with only the mutated scalar fields overridden; nested
+        # config fields are shared read-only across instances
+        deployment = deployment.model_copy(update=update)
 
         return BatchInstance(
             env=EnvironmentConfig(deployment=deployment, repo=repo), problem_statement=problem_statement
@@ -286,6 +403,11 @@ EOFWRAP
     @classmethod
     def from_swe_bench(cls, instance: dict[str, Any]) -> Self:
         """Convert instances from the classical SWE-bench dataset or Multi-SWE-bench to the `SimpleBatchInstance` format."""
+        return cls(**cls._fields_from_swe_bench(instance))
+
+    @staticmethod
+    def _fields_from_swe_bench(instance: dict[str, Any]) -> dict[str, Any]:
+        """Resolve the `SimpleBatchInstance` field values from a raw dataset row."""
         # Handle Multi-SWE-bench format (has org, repo, number fields)
         if "org" in instance and "repo" in instance and "number" in instance:
             # Multi-SWE-bench format: org, repo, number
@@ -297,26 +419,15 @@ EOFWRAP
             # Multi-SWE-bench image format: mswebench/{org}_m_{repo}:pr-{number}
             image_name = instance.get("image_name", None)
             if image_name is None:
-                org_safe = org.replace("_", "-")
-                repo_safe = repo.replace("_", "-")
+                org_safe = org.translate(_DASH_TABLE)
+                repo_safe = repo.translate(_DASH_TABLE)
                 image_name = f"mswebench/{org_safe}_m_{repo_safe}:pr-{number}"
             
             # 无论 image_name 是否已存在，都检查是否有 patched 版本（优先使用）
             if image_name and not image_name.endswith("-patched"):
                 patched_image_name = f"{image_name}-patched"
-                # 使用 subprocess 检查镜像是否存在（更可靠，不依赖docker库）
-                import subprocess
-                try:
-                    result = subprocess.run(
-                        ["docker", "image", "inspect", patched_image_name],
-                        capture_output=True,
-                        timeout=2,
-                        check=False
-                    )
-                    if result.returncode == 0:
-                        image_name = patched_image_name
-                except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
-                    pass  # 如果检查失败，使用原始镜像名
+                if _patched_image_exists(patched_image_name):
+                    image_name = patched_image_name
 
             # Extract problem statement from body or title
             problem_statement = instance.get("body") or instance.get("title") or instance.get("problem_statement", "")
@@ -354,7 +465,8 @@ EOFWRAP
             if image_name is None:
                 # Docker doesn't allow double underscore, so we replace them with a magic token
                 id_docker_compatible = iid.replace("__", "_1776_")
-                image_name = f"docker.io/swebench/sweb.eval.x86_64.{id_docker_compatible}:latest".lower()
+                # Only the instance-derived segment needs lowering; the literal parts already are
+                image_name = f"docker.io/swebench/sweb.eval.x86_64.{id_docker_compatible.lower()}:latest"
             problem_statement = instance.get("problem_statement", "")
             base_commit = instance.get("base_commit", "HEAD")
         else:
@@ -364,13 +476,14 @@ EOFWRAP
             if image_name is None:
                 # Docker doesn't allow double underscore, so we replace them with a magic token
                 id_docker_compatible = iid.replace("__", "_1776_")
-                image_name = f"docker.io/swebench/sweb.eval.x86_64.{id_docker_compatible}:latest".lower()
+                # Only the instance-derived segment needs lowering; the literal parts already are
+                image_name = f"docker.io/swebench/sweb.eval.x86_64.{id_docker_compatible.lower()}:latest"
             problem_statement = instance["problem_statement"]
             base_commit = instance["base_commit"]
         
         extra_fields = {}
         if "image_assets" in instance:
-            issue_images = json.loads(instance["image_assets"])["problem_statement"]
+            issue_images = _loads(instance["image_assets"])["problem_statement"]
             extra_fields["issue_images"] = issue_images
         
         # For Multi-SWE-bench, use the actual repo name (located at /home/{repo_name})
@@ -382,14 +495,14 @@ EOFWRAP
             # Standard SWE-bench format: repository is at /testbed
             repo_name = "testbed"
         
-        return cls(
-            image_name=image_name,
-            problem_statement=problem_statement,
-            instance_id=iid,
-            repo_name=repo_name,
-            base_commit=base_commit,
-            extra_fields=extra_fields,
-        )
+        return {
+            "image_name": image_name,
+            "problem_statement": problem_statement,
+            "instance_id": iid,
+            "repo_name": repo_name,
+            "base_commit": base_commit,
+            "extra_fields": extra_fields,
+        }
 
 
 class InstancesFromFile(BaseModel, AbstractInstanceSource):
@@ -419,10 +532,18 @@ class InstancesFromFile(BaseModel, AbstractInstanceSource):
     """Discriminator for (de)serialization/CLI. Do not change."""
 
     def get_instance_configs(self) -> list[BatchInstance]:
+        _ensure_swerex_patched()
         instance_dicts = load_file(self.path)
-        simple_instances = [SimpleBatchInstance.model_validate(instance_dict) for instance_dict in instance_dicts]
-        instances = [instance.to_full_batch_instance(self.deployment) for instance in simple_instances]
-        return _filter_batch_items(instances, filter_=self.filter, slice_=self.slice, shuffle=self.shuffle)
+        # Filter on the raw dict's id before any pydantic validation or
+        # deployment copy happens; filtered-out rows never cost a model build
+        # ("id" is the pre-1.0.1 spelling handled by handle_legacy_id)
+        pat = re.compile(self.filter)
+        instances = [
+            SimpleBatchInstance.model_validate(instance_dict).to_full_batch_instance(self.deployment)
+            for instance_dict in instance_dicts
+            if pat.match(instance_dict.get("instance_id") or instance_dict.get("id") or "")
+        ]
+        return _filter_batch_items(instances, filter_=".*", slice_=self.slice, shuffle=self.shuffle)
 
     @property
     def id(self) -> str:
@@ -456,10 +577,17 @@ class InstancesFromHuggingFace(BaseModel, AbstractInstanceSource):
     def get_instance_configs(self) -> list[BatchInstance]:
         from datasets import load_dataset
 
+        _ensure_swerex_patched()
         ds: list[dict[str, Any]] = load_dataset(self.dataset_name, split=self.split)  # type: ignore
-        simple_instances: list[SimpleBatchInstance] = [SimpleBatchInstance.model_validate(instance) for instance in ds]
-        instances = [instance.to_full_batch_instance(self.deployment) for instance in simple_instances]
-        return _filter_batch_items(instances, filter_=self.filter, slice_=self.slice, shuffle=self.shuffle)
+        # Same raw-dict early filter as InstancesFromFile: only survivors pay
+        # for pydantic validation and the deployment copy
+        pat = re.compile(self.filter)
+        instances = [
+            SimpleBatchInstance.model_validate(instance).to_full_batch_instance(self.deployment)
+            for instance in ds
+            if pat.match(instance.get("instance_id") or instance.get("id") or "")
+        ]
+        return _filter_batch_items(instances, filter_=".*", slice_=self.slice, shuffle=self.shuffle)
 
     @property
     def id(self) -> str:
@@ -526,38 +654,40 @@ class SWEBenchInstances(BaseModel, AbstractInstanceSource):
         from datasets import load_dataset
         import re
 
+        _ensure_swerex_patched()
         dataset_path = self._get_dataset_path()
         
         # For Multi-SWE-bench, use streaming mode to avoid type casting issues
         # Multi-SWE-bench has complex nested structures that cause PyArrow issues
-        is_multiswe = "Multi-SWE-bench" in dataset_path or "multi-swe-bench" in dataset_path.lower()
+        # (one case-insensitive scan instead of two scans plus a lower() allocation)
+        is_multiswe = "multi-swe-bench" in dataset_path.casefold()
         
         if isinstance(self.deployment, DockerDeploymentConfig):
             self.deployment.platform = "linux/amd64"
 
         if is_multiswe:
             # Load image overrides if available
-            image_overrides = {}
-            # Try multiple possible paths for image_overrides.json
-            possible_paths = [
-                Path(__file__).parent.parent.parent.parent / "image_overrides.json",  # From sweagent-eval root
-                Path(__file__).parent.parent.parent / "image_overrides.json",  # From SWE-agent root
-                Path.cwd() / "image_overrides.json",  # Current working directory
-            ]
-            for override_file in possible_paths:
-                if override_file.exists():
-                    try:
-                        with open(override_file, "r") as f:
-                            image_overrides = json.load(f)
-                        logger.debug(f"Loaded {len(image_overrides)} image overrides from {override_file}")
-                        break
-                    except Exception as e:
-                        logger.warning(f"Failed to load image overrides from {override_file}: {e}")
-            
+            image_overrides = _image_overrides()
+
+            # Warm the local image listing before streaming starts so the
+            # per-row patched-image checks below are pure set lookups instead
+            # of blocking the stream on the first docker call
+            _local_docker_images()
+
             # Use streaming mode for Multi-SWE-bench and process on-the-fly
             dataset = load_dataset(dataset_path, split=self.split, streaming=True)  # type: ignore
             instances = []
-            filter_pattern = re.compile(self.filter) if self.filter != ".*" else None
+            # Pre-resolve the id filter: match() is anchored like the re.match
+            # used in _filter_batch_items (search() scanned the whole id), and
+            # plain literal patterns skip the regex engine for a prefix check
+            has_filter = self.filter != ".*"
+            filter_literal = None
+            filter_pattern = None
+            if has_filter:
+                if re.escape(self.filter) == self.filter:
+                    filter_literal = self.filter
+                else:
+                    filter_pattern = re.compile(self.filter)
             
             for instance_dict in dataset:
                 # For Multi-SWE-bench, generate instance_id from org/repo/number before conversion
@@ -571,24 +701,24 @@ class SWEBenchInstances(BaseModel, AbstractInstanceSource):
                     instance_id = instance_dict.get("instance_id", "")
                 
                 # Apply filter early to avoid unnecessary processing
-                if filter_pattern and not filter_pattern.search(instance_id):
+                if filter_literal is not None:
+                    if not instance_id.startswith(filter_literal):
+                        continue
+                elif filter_pattern is not None and not filter_pattern.match(instance_id):
                     continue
                 
-                # Apply image override if available
-                if instance_id in image_overrides:
-                    instance_dict["image_name"] = image_overrides[instance_id]
-                    logger.debug(f"Applied image override for {instance_id}: {image_overrides[instance_id]}")
-                
-                # Convert to SimpleBatchInstance format
-                simple_instance = SimpleBatchInstance.from_swe_bench(instance_dict)
+                # Apply image override if available (single lookup, lazy log formatting)
+                override = image_overrides.get(instance_id)
+                if override is not None:
+                    instance_dict["image_name"] = override
+                    logger.debug("Applied image override for %s: %s", instance_id, override)
                 
-                # Convert to full batch instance
-                batch_instance = simple_instance.to_full_batch_instance(self.deployment)
-                instances.append(batch_instance)
+                # Fused dict -> BatchInstance conversion (no intermediate validation pass)
+                instances.append(BatchInstance.from_swe_bench_dict(instance_dict, self.deployment))
                 
                 # If we have a specific filter and found a match, we can break early
                 # (but only if not shuffling and no slice)
-                if filter_pattern and not self.shuffle and not self.slice:
+                if has_filter and not self.shuffle and not self.slice:
                     break
             
             # Apply slice and shuffle if needed
@@ -596,9 +726,7 @@ class SWEBenchInstances(BaseModel, AbstractInstanceSource):
         else:
             # Standard non-streaming mode
             ds: list[dict[str, Any]] = load_dataset(dataset_path, split=self.split)  # type: ignore
-            instances = [
-                SimpleBatchInstance.from_swe_bench(instance).to_full_batch_instance(self.deployment) for instance in ds
-            ]
+            instances = [BatchInstance.from_swe_bench_dict(instance, self.deployment) for instance in ds]
             return _filter_batch_items(instances, filter_=self.filter, slice_=self.slice, shuffle=self.shuffle)
 
     @property
@@ -669,6 +797,7 @@ class SWESmithInstances(BaseModel, AbstractInstanceSource):
             instance_dict["extra_fields"] = {"fail_to_pass": instance_dict["FAIL_TO_PASS"]}
             return instance_dict
 
+        _ensure_swerex_patched()
         instance_dicts = load_file(self.path)
         instances = [
             SimpleBatchInstance.model_validate(convert_instance_dict(instance_dict)).to_full_batch_instance(
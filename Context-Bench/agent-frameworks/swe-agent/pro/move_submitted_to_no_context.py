@@ -1,45 +1,292 @@
 #!/usr/bin/env python3
 """将 run_batch_exit_statuses.yaml 中所有 submitted* 的实例目录从 gpt-5__missing_pro 移动到 gpt-5__no-context。"""
 
+import argparse
+import json
+import os
 import shutil
+import sys
 import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as _Loader  # libyaml C 绑定，解析快一个数量级
+except ImportError:  # 未编译 libyaml 时回退纯 Python 实现
+    from yaml import SafeLoader as _Loader
+
 # 使用脚本所在目录作为基准，支持相对路径
 SCRIPT_DIR = Path(__file__).parent
 SRC = SCRIPT_DIR / "trajectories" / "gpt-5__missing_pro"
 DST = SCRIPT_DIR / "trajectories" / "gpt-5__no-context"
 STATUS_FILE = SRC / "run_batch_exit_statuses.yaml"
+# 幂等标记：首行记录状态文件 mtime_ns，其余为已确认移动完成的实例名
+MANIFEST = DST / ".moved_manifest.txt"
+
+# 热路径里用纯字符串拼路径，绕开 pathlib 每次构造对象的开销；
+# pathlib 只保留在模块级常量上
+_SRC_BASE = str(SRC) + os.sep
+_DST_BASE = str(DST) + os.sep
+
+def _build_node(events, event):
+    """从事件流递归构造一个节点（仅服务于目标子树，别名节点用不到）。"""
+    if isinstance(event, yaml.ScalarEvent):
+        return event.value
+    if isinstance(event, yaml.SequenceStartEvent):
+        seq = []
+        for ev in events:
+            if isinstance(ev, yaml.SequenceEndEvent):
+                return seq
+            seq.append(_build_node(events, ev))
+    if isinstance(event, yaml.MappingStartEvent):
+        mapping = {}
+        for ev in events:
+            if isinstance(ev, yaml.MappingEndEvent):
+                return mapping
+            mapping[ev.value] = _build_node(events, next(events))
+    return None
+
+
+def _parse_by_status(f) -> dict:
+    """事件级扫描 YAML，只物化 instances_by_exit_status 子树。
+
+    其余顶层键的节点完全不构造 Python 对象，命中目标子树后直接停止解析。
+    """
+    events = yaml.parse(f, Loader=_Loader)
+    depth = 0
+    awaiting_value = False  # 刚消费过一个顶层键，下一个节点是它的值
+    for event in events:
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            depth += 1
+            if depth == 2:
+                awaiting_value = False  # 值是一个集合，整体跳过
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            depth -= 1
+        elif isinstance(event, yaml.ScalarEvent) and depth == 1:
+            if awaiting_value:
+                awaiting_value = False  # 上一个键的标量值
+            elif event.value == "instances_by_exit_status":
+                return _build_node(events, next(events)) or {}
+            else:
+                awaiting_value = True
+    return {}
+
+
+def _load_by_status() -> dict:
+    """读取 instances_by_exit_status 子树，带按 mtime+size 键控的 JSON 旁路缓存。
+
+    状态文件在两次运行之间基本不变；缓存命中时整个解析退化为一次 stat
+    加 C 实现的 json.loads，比重新跑 YAML 解析快一个数量级。
+    """
+    st = STATUS_FILE.stat()
+    key = f"{st.st_mtime_ns}-{st.st_size}"
+    cache = STATUS_FILE.with_suffix(".yaml.cache.json")
+    try:
+        header, _, rest = cache.read_text().partition("\n")
+        if header == f"# key={key}":
+            return json.loads(rest)
+    except (OSError, ValueError):
+        pass
+
+    # 二进制直接喂给 libyaml 流式解析，省掉先 read_text 再解析的中间字符串；
+    # 事件级过滤只构造我们要的子树
+    with STATUS_FILE.open("rb") as f:
+        by_status = _parse_by_status(f)
+
+    # 只缓存用得到的子树；先写临时文件再 replace，保证缓存要么完整要么没有
+    tmp = cache.with_suffix(".tmp")
+    try:
+        tmp.write_text(f"# key={key}\n" + json.dumps(by_status))
+        tmp.replace(cache)
+    except OSError:
+        pass
+    return by_status
 
-def main():
-    data = yaml.safe_load(STATUS_FILE.read_text())
-    by_status = data.get("instances_by_exit_status") or {}
 
-    # 收集所有 submitted* 键下的实例名
-    to_move = []
-    for k, v in by_status.items():
-        if v and isinstance(v, list) and "submitted" in k.lower():
-            to_move.extend(v)
+def _move_one(entry: dict, same_fs: bool = False) -> tuple:
+    """执行一条计划：移动单个实例目录，返回 (状态, 日志行)。
 
-    to_move = sorted(set(to_move))
-    print(f"共 {len(to_move)} 个 submitted 实例待移动")
+    源目录存在性与目标碰撞清理都已在前置阶段批量完成。
+    """
+    name, src_dir, dst_dir = entry["name"], entry["src"], entry["dst"]
+    note = "（目标已存在，先删除）" if entry.get("collide") else ""
+    if same_fs:
+        # 同一文件系统：一次 rename 系统调用移动整棵目录树，
+        # 不用 shutil.move 内部的逐级 stat
+        try:
+            os.rename(src_dir, dst_dir)
+            return ("moved", f"  moved: {name}{note}")
+        except OSError:
+            pass  # 目标被并发重建等罕见情况，走下面的慢路径
+    # 目标若在计划之后又出现，按原语义先删再移，避免 move 嵌套进目标目录
+    if os.path.lexists(dst_dir):
+        shutil.rmtree(dst_dir, ignore_errors=True)
+    shutil.move(src_dir, dst_dir)
+    return ("moved", f"  moved: {name}{note}")
+
+
+@lru_cache(maxsize=None)
+def _submitted_keys(keys: tuple) -> tuple:
+    """筛出 submitted* 状态键；每个键只小写化一次，同一键集的重复调用直接命中缓存。"""
+    return tuple(k for k in keys if "submitted" in k.lower())
+
+
+def _manifest_up_to_date(status_mtime_ns: int) -> bool:
+    """上次运行已针对同一版本状态文件完成、且记录的目录仍在 DST 时返回 True。"""
+    try:
+        lines = MANIFEST.read_text().splitlines()
+    except OSError:
+        return False
+    if not lines or lines[0] != str(status_mtime_ns):
+        return False
+    recorded = set(lines[1:])
+    present = {e.name for e in os.scandir(DST)}
+    return recorded <= present
+
+
+def _discover() -> tuple:
+    """发现阶段：解析状态文件、核对文件系统，产出可序列化的移动计划。
+
+    返回 (计划条目列表, 过滤前的完整名单, 日志行列表)；不做任何变更。
+    """
+    by_status = _load_by_status()
+
+    # 收集所有 submitted* 键下的实例名：键过滤只扫一遍，
+    # 集合推导边收集边去重，省掉中间列表和事后 set() 的重哈希
+    # 移动本身不依赖顺序，不在派发前排序（排序要等全部名字就位才能开动）；
+    # 只在最后对日志行排一次序保证输出确定
+    submitted_keys = _submitted_keys(tuple(by_status))
+    to_move = list({
+        name
+        for k in submitted_keys
+        for name in (by_status.get(k) or [])
+        if isinstance(name, str)
+    })
+    requested = to_move  # 过滤前的完整名单，收尾时写幂等标记用
+    # 日志行先攒在列表里，最后一次性写 stdout：
+    # 几千个实例就是几千次 write 系统调用，攒批后只剩一次
+    log = [f"共 {len(to_move)} 个 submitted 实例待移动"]
+
+    # 一次 scandir 读出 SRC 现存子目录集合，取代每个候选名一次 stat
+    existing = {e.name for e in os.scandir(SRC) if e.is_dir(follow_symlinks=False)}
+    for name in to_move:
+        if name not in existing:
+            log.append(f"  [SKIP] 源目录不存在: {_SRC_BASE + name}")
 
     DST.mkdir(parents=True, exist_ok=True)
+    # 碰撞检测用一次 scandir 的目录快照代替每实例一次 lstat
+    existing_dst = {e.name for e in os.scandir(DST)}
+    entries = [
+        {"name": n, "src": _SRC_BASE + n, "dst": _DST_BASE + n, "collide": n in existing_dst}
+        for n in to_move
+        if n in existing
+    ]
+    return entries, requested, log
+
+
+def _execute(entries: list, on_done=None) -> tuple:
+    """执行阶段：只认计划条目，不感知 YAML。返回 (moved, 日志行列表)。"""
+    # 同设备判定只做一次；命中时 _move_one 走单次 rename 的快路径
+    same_fs = SRC.stat().st_dev == DST.stat().st_dev
+    max_workers = min(32, (os.cpu_count() or 4) * 4)
+
+    # 第一阶段：并行清掉会碰撞的目标目录。递归删除由逐文件 unlink 延迟
+    # 主导，并行几乎线性加速，且与后面的重命名阶段分开，互不阻塞
+    collisions = [e["dst"] for e in entries if e.get("collide")]
+    if collisions:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            list(ex.map(lambda p: shutil.rmtree(p, ignore_errors=True), collisions))
+
+    # 第二阶段：移动是纯 I/O（rename/unlink 等内核调用），串行跑每一步
+    # 都在等盘；扔进线程池让内核同时看到多个未完成请求。日志行由 worker
+    # 返回、主线程统一收集，避免乱序输出把 worker 串行化
+    lines = []
     moved = 0
-    for name in to_move:
-        src_dir = SRC / name
-        dst_dir = DST / name
-        if not src_dir.is_dir():
-            print(f"  [SKIP] 源目录不存在: {src_dir}")
-            continue
-        if dst_dir.exists():
-            print(f"  [SKIP] 目标已存在，先删除: {dst_dir}")
-            shutil.rmtree(dst_dir, ignore_errors=True)
-        shutil.move(str(src_dir), str(dst_dir))
-        print(f"  moved: {name}")
-        moved += 1
-
-    print(f"已移动 {moved} 个实例到 {DST}")
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(_move_one, e, same_fs): e for e in entries}
+        for fut in as_completed(futures):
+            status, line = fut.result()
+            lines.append(line)
+            if status == "moved":
+                moved += 1
+            if on_done is not None:
+                on_done(futures[fut])
+    return moved, lines
+
+
+def _apply(plan_path: str):
+    """执行既有计划文件，完成的行号记到 <plan>.done，可断点续跑。"""
+    done_path = plan_path + ".done"
+    try:
+        done = {int(x) for x in Path(done_path).read_text().split()}
+    except (OSError, ValueError):
+        done = set()
+
+    entries = []
+    with open(plan_path) as f:
+        for idx, line in enumerate(f):
+            if line.strip() and idx not in done:
+                entry = json.loads(line)
+                entry["_idx"] = idx
+                entries.append(entry)
+
+    if not entries:
+        print("计划已全部执行，无需处理")
+        return
+
+    DST.mkdir(parents=True, exist_ok=True)
+    # 行缓冲 append：每完成一条就把行号落盘，中断后重跑从第一条未完成行继续
+    with open(done_path, "a", buffering=1) as done_f:
+        moved, lines = _execute(entries, on_done=lambda e: done_f.write(f"{e['_idx']}\n"))
+
+    sys.stdout.write("\n".join(sorted(lines) + [f"已移动 {moved} 个实例到 {DST}"]) + "\n")
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="移动 submitted* 实例目录；发现与执行两阶段可分开跑")
+    parser.add_argument("--plan-only", action="store_true", help="只做发现阶段，把计划写成 JSONL 后退出")
+    parser.add_argument("--plan-file", default=str(SCRIPT_DIR / "plan.jsonl"), help="--plan-only 的输出路径")
+    parser.add_argument("--apply", metavar="PLAN", help="跳过发现阶段，直接执行指定计划文件（支持断点续跑）")
+    args = parser.parse_args(argv)
+
+    if args.apply:
+        _apply(args.apply)
+        return
+
+    # 状态文件没动过且上次已全部移完时，整个脚本收敛为两次 stat 加一次目录读
+    status_mtime_ns = STATUS_FILE.stat().st_mtime_ns
+    if not args.plan_only and _manifest_up_to_date(status_mtime_ns):
+        print("状态文件未变化，上次移动已全部完成，无需处理")
+        return
+
+    entries, requested, log = _discover()
+
+    if args.plan_only:
+        with open(args.plan_file, "w") as f:
+            f.writelines(json.dumps(e) + "\n" for e in entries)
+        log.append(f"计划已写入 {args.plan_file}（{len(entries)} 条）")
+        sys.stdout.write("\n".join(log) + "\n")
+        return
+
+    moved, lines = _execute(entries)
+    log.extend(sorted(lines))
+    log.append(f"已移动 {moved} 个实例到 {DST}")
+
+    # 原子更新幂等标记：记录当前状态文件版本下已落位的实例名
+    # （目录快照只读一次，避免每个候选名各扫一遍目录）
+    dst_names = {e.name for e in os.scandir(DST)}
+    done = sorted(n for n in requested if n in dst_names)
+    tmp = MANIFEST.with_suffix(".tmp")
+    try:
+        tmp.write_text("\n".join([str(status_mtime_ns), *done]) + "\n")
+        tmp.replace(MANIFEST)
+    except OSError:
+        pass
+
+    sys.stdout.write("\n".join(log) + "\n")
+    sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
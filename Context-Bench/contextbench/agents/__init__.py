@@ -1,10 +1,48 @@
 """Unified agent trajectory extraction interface."""
 
-from .minisweagent import extract_trajectory as extract_miniswe
-from .sweagent import extract_trajectory as extract_swe
-from .agentless import extract_trajectory as extract_agentless
-from .prometheus import extract_trajectory as extract_prometheus
-from .openhands import extract_trajectory as extract_openhands
+import importlib
+
+# Public alias -> submodule providing extract_trajectory. The submodules are
+# imported lazily (PEP 562 module __getattr__) so that importing this package
+# does not pay for all five extractors when only one format is ever used;
+# `from contextbench.agents import extract_swe` etc. keeps working.
+_EXTRACTORS = {
+    'extract_miniswe': 'minisweagent',
+    'extract_swe': 'sweagent',
+    'extract_agentless': 'agentless',
+    'extract_prometheus': 'prometheus',
+    'extract_openhands': 'openhands',
+}
+
+# Suffix -> extractor dispatch, walked in order. Suffixes are mutually
+# exclusive ('.traj.json' never matches '.traj' or '_traj.json'), so the
+# order only fixes priority for future additions. The '.log' case stays a
+# separate branch below because it validates the extractor's output.
+_SUFFIX_DISPATCH = (
+    ('.checkpoints.jsonl', 'extract_swe'),
+    ('.context.json', 'extract_swe'),
+    ('patch_context.txt', 'extract_swe'),
+    ('.traj.json', 'extract_miniswe'),
+    ('_traj.json', 'extract_agentless'),
+    ('.traj', 'extract_swe'),
+    ('output.jsonl', 'extract_openhands'),
+)
+
+
+def _extractor(alias: str):
+    """Resolve an extractor alias, importing its submodule on first use."""
+    fn = globals().get(alias)
+    if fn is None:
+        module = importlib.import_module('.' + _EXTRACTORS[alias], __name__)
+        fn = module.extract_trajectory
+        globals()[alias] = fn  # cache so later attribute access skips __getattr__
+    return fn
+
+
+def __getattr__(name: str):
+    if name in _EXTRACTORS:
+        return _extractor(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def extract_trajectory(traj_file_or_data) -> dict:
@@ -30,27 +68,19 @@ def extract_trajectory(traj_file_or_data) -> dict:
     # Handle dict input (OpenHands pre-parsed data)
     if isinstance(traj_file_or_data, dict):
         if 'history' in traj_file_or_data:
-            return extract_openhands(traj_file_or_data)
+            return _extractor('extract_openhands')(traj_file_or_data)
         else:
             raise ValueError(f"Unsupported dict format (no 'history' field)")
-    
+
     # Handle file path input
     traj_file = traj_file_or_data
-    if (traj_file.endswith('.checkpoints.jsonl') 
-        or traj_file.endswith('.context.json') 
-        or traj_file.endswith('patch_context.txt')
-        or traj_file.endswith('.traj')):
-        return extract_swe(traj_file)
-    elif traj_file.endswith('.traj.json'):
-        return extract_miniswe(traj_file)
-    elif traj_file.endswith('_traj.json'):
-        return extract_agentless(traj_file)
-    elif traj_file.endswith('output.jsonl'):
-        return extract_openhands(traj_file)
-    elif traj_file.endswith('.log'):
+    for suffix, alias in _SUFFIX_DISPATCH:
+        if traj_file.endswith(suffix):
+            return _extractor(alias)(traj_file)
+    if traj_file.endswith('.log'):
         # Prometheus .log files can be very large and the context markers may not
         # appear in the first few KB. Let the Prometheus extractor decide.
-        data = extract_prometheus(traj_file)
+        data = _extractor('extract_prometheus')(traj_file)
         if data.get("pred_steps") or data.get("pred_files") or data.get("pred_spans"):
             return data
         raise ValueError(f"Unsupported .log trajectory format: {traj_file}")
@@ -10,40 +10,108 @@ Fallback policy (only for steps):
 - This fallback never affects final context: final is still `<PATCH_CONTEXT>` only.
 """
 
+import functools
 import json
+import mmap
 import re
+import sys
 from typing import Dict, List, Any
 
+try:
+    import orjson  # optional: faster parsing for large trajectory files
+except ImportError:
+    orjson = None
+
+
+def _loads(data: "bytes | str") -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# Patterns compiled once at import time; the extractors run them once per
+# message/command, so per-call re.compile cache lookups add up on big trajs.
+_BASH_BLOCK_RE = re.compile(r"```bash\s*\r?\n([\s\S]*?)\r?\n```")
+_IMAGE_REPO_RE = re.compile(r"_m_([A-Za-z0-9_.-]+)(?::|$)")
+_LINES_RE = re.compile(r"(\d+)\s*-\s*(\d+)")
+# A "File:" line followed by its (possibly several) "Lines:" entries, matched
+# in one pass instead of a per-line startswith loop.
+_PAIR_RE = re.compile(
+    r"^\s*File:\s*(?P<file>[^\r\n]+?)\s*$"
+    r"(?P<lines>(?:\s*^\s*Lines:\s*\d+\s*-\s*\d+\s*$)*)",
+    re.MULTILINE,
+)
+_CHUNK_SPLIT_RE = re.compile(r"\s*(?:&&|\|\||;)\s*")
+_VIEW_TOOLS = ("sed", "nl", "head", "cat", "grep")
+# All viewing-command shapes as one alternation so each chunk is scanned once.
+# The matched alternative is identified via m.lastgroup (the last group of each
+# alternative is named after it).
+_CMD_RE = re.compile(
+    r"nl\s+[^|]+\s+(?P<nl_file>[^\s|]+)\s*\|\s*sed\s+-n\s+['\"]?(?P<nl_start>\d+),(?P<nl_end>\d+)p"
+    r"|sed\s+-n\s+['\"]?(?P<sed_start>\d+),(?P<sed_end>\d+)p['\"]?\s+(?P<sed_file>[^\s&|>;<]+)"
+    r"|\bhead\s+-n\s+(?P<head_n>\d+)\s+(?P<head_file>[^\s&|>]+)"
+    r"|\bcat\s+(?P<cat_file>[^\s&|>]+)"
+    r"|\bgrep\s+.*?\s+(?P<grep_file>[^\s&|>]+\.(?:py|js|java|go|rs|c|cpp|h|hpp|ts|tsx|jsx|rb|php|cs|kt|scala|swift))\b"
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _tag_pattern(tag: str) -> "re.Pattern[str]":
+    """Compiled <tag>...</tag> pattern, built once per distinct tag."""
+    return re.compile(rf"<{re.escape(tag)}>\s*([\s\S]*?)\s*</{re.escape(tag)}>")
+
 
 def extract_trajectory(traj_file: str) -> Dict[str, Any]:
     """Extract trajectory steps and final context from a MiniSWE `.traj.json` file."""
-    with open(traj_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(traj_file, 'rb') as f:
+        if orjson is not None:
+            # Zero-copy parse: map the file and hand orjson a memoryview of it,
+            # skipping the intermediate bytes object a plain f.read() builds.
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = orjson.loads(memoryview(mm))
+            except (ValueError, OSError):
+                # Empty file or mmap-unfriendly filesystem: read normally.
+                data = _loads(f.read())
+        else:
+            # Stdlib json cannot consume a memoryview; read the bytes.
+            data = _loads(f.read())
     
     steps: List[Dict[str, Any]] = []
+    patch_blocks: List[str] = []
+    fallback_contents: List[str] = []
 
     # Heuristic: in Multi-SWE-bench docker images, repos are usually under /home/<repo_dir>/...
     # We normalize such absolute paths to repo-relative paths when the repo dir is known.
     repo_dir_name = _infer_repo_dir_name(data)
 
-    # --- steps: <explore_context> blocks (preferred) ---
+    # Single pass over the messages: collect <explore_context> steps, all
+    # <PATCH_CONTEXT> blocks and the candidate assistant bash messages for the
+    # fallback in one sweep instead of three. Most messages carry no tags at
+    # all, so substring checks gate the tag regexes.
+    #
+    # Deliberately sequential: CPython's re module holds the GIL while
+    # matching, so fanning messages out to a thread pool serializes on the
+    # lock and only adds chunking/join overhead. The substring gates above
+    # make the common no-tag message an O(n) scan, which is the cheaper win.
     for msg in data.get("messages", []):
         content = msg.get("content", "") or ""
-        for block in _extract_tag_blocks(content, tag="explore_context"):
-            spans_by_file = _parse_file_lines_pairs(block, repo_dir_name=repo_dir_name)
-            if not spans_by_file:
-                continue
-            files = sorted(spans_by_file.keys())
-            steps.append({"files": files, "spans": spans_by_file})
+        # --- steps: <explore_context> blocks (preferred) ---
+        if "<explore_context>" in content:
+            for block in _extract_tag_blocks(content, tag="explore_context"):
+                spans_by_file = _parse_file_lines_pairs(block, repo_dir_name=repo_dir_name)
+                if not spans_by_file:
+                    continue
+                files = sorted(spans_by_file.keys())
+                steps.append({"files": files, "spans": spans_by_file})
+        if "<PATCH_CONTEXT>" in content:
+            patch_blocks.extend(_extract_tag_blocks(content, tag="PATCH_CONTEXT"))
+        if msg.get("role") == "assistant" and "```bash" in content:
+            fallback_contents.append(content)
 
     # --- steps fallback: bash command parsing (only if no explore_context exists) ---
     if not steps:
-        for msg in data.get("messages", []):
-            if msg.get("role") != "assistant":
-                continue
-            content = msg.get("content", "") or ""
+        for content in fallback_contents:
             # Be tolerant to different newline conventions and extra whitespace.
-            match = re.search(r"```bash\s*\r?\n([\s\S]*?)\r?\n```", content)
+            match = _BASH_BLOCK_RE.search(content)
             if not match:
                 continue
             cmd = match.group(1).strip()
@@ -67,17 +135,13 @@ def extract_trajectory(traj_file: str) -> Dict[str, Any]:
                         {"type": "line", "start": int(view["start_line"]), "end": int(view["end_line"])}
                     )
 
-            # De-dup files for this step, keep deterministic order
+            # De-dup files for this step; dict.fromkeys keeps command order,
+            # which is deterministic and skips the per-step set+sort
             if step_data["files"]:
-                step_data["files"] = sorted(set(step_data["files"]))
+                step_data["files"] = list(dict.fromkeys(step_data["files"]))
                 steps.append(step_data)
 
     # --- final: last <PATCH_CONTEXT> block (strict) ---
-    patch_blocks: List[str] = []
-    for msg in data.get("messages", []):
-        content = msg.get("content", "") or ""
-        patch_blocks.extend(_extract_tag_blocks(content, tag="PATCH_CONTEXT"))
-
     final_files: List[str] = []
     final_spans: Dict[str, List[Dict[str, int]]] = {}
     if patch_blocks:
@@ -92,7 +156,7 @@ def _infer_repo_dir_name(data: Dict[str, Any]) -> str:
     try:
         image = data.get("info", {}).get("config", {}).get("environment", {}).get("image", "") or ""
         # Example: mswebench/alibaba_m_fastjson2:pr-2559 -> fastjson2
-        m = re.search(r"_m_([A-Za-z0-9_.-]+)(?::|$)", image)
+        m = _IMAGE_REPO_RE.search(image)
         if m:
             return m.group(1)
     except Exception:
@@ -100,9 +164,13 @@ def _infer_repo_dir_name(data: Dict[str, Any]) -> str:
     return ""
 
 
+@functools.lru_cache(maxsize=8192)
 def _normalize_path(path: str, repo_dir_name: str = "") -> str:
     """Normalize container paths to *candidate* repo-relative paths.
 
+    Trajectories view the same handful of paths over and over, so the
+    normalization is memoized (both arguments are plain strings).
+
     Note: final validation is performed later in evaluation by resolving path suffixes
     against the checked-out repo worktree. Here we avoid hard-coded prefix rules as much
     as possible and do not drop unknown absolute prefixes.
@@ -137,17 +205,20 @@ def _normalize_path(path: str, repo_dir_name: str = "") -> str:
     if p.startswith("./"):
         p = p[2:]
 
-    return p
+    # Interning makes every step/span structure share one string object per
+    # path and lets dict lookups take the identity-compare shortcut.
+    return sys.intern(p)
 
 
 def _extract_tag_blocks(text: str, tag: str) -> List[str]:
     """Return list of inner text payloads for <tag>...</tag> blocks (case-sensitive)."""
-    if not text:
+    # Bail before touching the regex when the opening tag cannot be present.
+    if not text or f"<{tag}>" not in text:
         return []
     # Support both lowercase and uppercase tag names as they appear in different traj templates.
     # Example: <explore_context>...</explore_context> and <PATCH_CONTEXT>...</PATCH_CONTEXT>
-    pattern = rf"<{re.escape(tag)}>\s*([\s\S]*?)\s*</{re.escape(tag)}>"
-    return [m.group(1) for m in re.finditer(pattern, text)]
+    # The pattern has a single group, so findall yields the payloads directly.
+    return _tag_pattern(tag).findall(text)
 
 
 def _parse_file_lines_pairs(text: str, repo_dir_name: str = "") -> Dict[str, List[Dict[str, int]]]:
@@ -155,27 +226,23 @@ def _parse_file_lines_pairs(text: str, repo_dir_name: str = "") -> Dict[str, Lis
 
     File: /path/to/file
     Lines: start-end
+
+    Each "Lines:" entry is attributed to the "File:" entry immediately above
+    it (only blank lines may sit in between).
     """
     result: Dict[str, List[Dict[str, int]]] = {}
-    current_file: str = ""
+    if not text or "File:" not in text:
+        return result
 
-    for raw in (text or "").splitlines():
-        line = (raw or "").strip()
-        if not line:
+    for m in _PAIR_RE.finditer(text):
+        f = _normalize_path(m.group("file"), repo_dir_name=repo_dir_name)
+        if not f:
             continue
-        if line.startswith("File:"):
-            f = line[len("File:") :].strip()
-            f = _normalize_path(f, repo_dir_name=repo_dir_name)
-            current_file = f or ""
-            continue
-        if line.startswith("Lines:") and current_file:
-            m = re.match(r"(\d+)\s*-\s*(\d+)", line[len("Lines:") :].strip())
-            if not m:
-                continue
-            a, b = int(m.group(1)), int(m.group(2))
+        for lm in _LINES_RE.finditer(m.group("lines")):
+            a, b = int(lm.group(1)), int(lm.group(2))
             if a > b:
                 a, b = b, a
-            result.setdefault(current_file, []).append({"type": "line", "start": a, "end": b})
+            result.setdefault(f, []).append({"type": "line", "start": a, "end": b})
 
     return result
 
@@ -190,68 +257,49 @@ def _extract_views_from_command(cmd: str) -> List[Dict[str, int | str]]:
         return []
     if any(p in cmd for p in ["sed -i", "echo ", "mkdir", "rm ", "git add", "git commit"]):
         return []
+    # Cheap substring sanity check before any regex work: most commands
+    # (cd, ls, python, ...) mention none of the viewing tools at all.
+    if not any(k in cmd for k in _VIEW_TOOLS):
+        return []
 
     views: List[Dict[str, int | str]] = []
 
     # Split composite commands so we can extract multiple views from one bash block.
-    chunks = re.split(r"\s*(?:&&|\|\||;)\s*", cmd)
+    chunks = _CHUNK_SPLIT_RE.split(cmd)
     for chunk in chunks:
         c = (chunk or "").strip()
-        if not c:
+        if not c or not any(k in c for k in _VIEW_TOOLS):
             continue
 
-        # nl -ba file | sed -n 'start,endp'
-        m = re.search(r"nl\s+[^|]+\s+([^\s|]+)\s*\|\s*sed\s+-n\s+['\"]?(\d+),(\d+)p", c)
-        if m:
-            f = m.group(1).strip("'\"")
-            if f.startswith("/testbed/"):
-                f = f[len("/testbed/") :]
-            if _is_source_file(f):
-                views.append({"file": f, "start_line": int(m.group(2)), "end_line": int(m.group(3))})
-            continue
-
-        # sed -n 'start,endp' file
-        m = re.search(r"sed\s+-n\s+['\"]?(\d+),(\d+)p['\"]?\s+([^\s&|>;<]+)", c)
-        if m:
-            f = m.group(3).strip("'\"")
-            if f.startswith("/testbed/"):
-                f = f[len("/testbed/") :]
-            if _is_source_file(f):
-                views.append({"file": f, "start_line": int(m.group(1)), "end_line": int(m.group(2))})
+        m = _CMD_RE.search(c)
+        if not m:
             continue
-
-        # head -n N file
-        m = re.search(r"\bhead\s+-n\s+(\d+)\s+([^\s&|>]+)", c)
-        if m:
-            f = m.group(2).strip("'\"")
-            if f.startswith("/testbed/"):
-                f = f[len("/testbed/") :]
-            if _is_source_file(f):
-                views.append({"file": f, "start_line": 1, "end_line": int(m.group(1))})
-            continue
-
-        # cat file (file-only)
-        m = re.search(r"\bcat\s+([^\s&|>]+)", c)
-        if m:
-            f = m.group(1).strip("'\"")
-            if f.startswith("/testbed/"):
-                f = f[len("/testbed/") :]
-            if _is_source_file(f):
+        kind = m.lastgroup
+        if kind == "nl_end":
+            # nl -ba file | sed -n 'start,endp'
+            f = _candidate_file(m.group("nl_file"))
+            if f:
+                views.append({"file": f, "start_line": int(m.group("nl_start")), "end_line": int(m.group("nl_end"))})
+        elif kind == "sed_file":
+            # sed -n 'start,endp' file
+            f = _candidate_file(m.group("sed_file"))
+            if f:
+                views.append({"file": f, "start_line": int(m.group("sed_start")), "end_line": int(m.group("sed_end"))})
+        elif kind == "head_file":
+            # head -n N file
+            f = _candidate_file(m.group("head_file"))
+            if f:
+                views.append({"file": f, "start_line": 1, "end_line": int(m.group("head_n"))})
+        elif kind == "cat_file":
+            # cat file (file-only)
+            f = _candidate_file(m.group("cat_file"))
+            if f:
                 views.append({"file": f})
-            continue
-
-        # grep ... file (file-only)
-        m = re.search(
-            r"\bgrep\s+.*?\s+([^\s&|>]+\.(?:py|js|java|go|rs|c|cpp|h|hpp|ts|tsx|jsx|rb|php|cs|kt|scala|swift))\b",
-            c,
-        )
-        if m:
-            f = m.group(1).strip("'\"")
-            if f.startswith("/testbed/"):
-                f = f[len("/testbed/") :]
-            if _is_source_file(f):
+        elif kind == "grep_file":
+            # grep ... file (file-only)
+            f = _candidate_file(m.group("grep_file"))
+            if f:
                 views.append({"file": f})
-            continue
 
     # De-dup while preserving order
     seen = set()
@@ -265,6 +313,14 @@ def _extract_views_from_command(cmd: str) -> List[Dict[str, int | str]]:
     return out
 
 
+def _candidate_file(raw: str) -> str:
+    """Strip quotes and the /testbed/ prefix; return '' unless it looks like source."""
+    f = raw.strip("'\"")
+    if f.startswith("/testbed/"):
+        f = f[len("/testbed/") :]
+    return f if _is_source_file(f) else ""
+
+
 def _is_source_file(path: str) -> bool:
     """Check if path looks like source file."""
     exts = [
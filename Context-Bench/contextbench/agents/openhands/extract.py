@@ -8,10 +8,37 @@ OpenHands trajectories record agent-environment interactions including:
 This extractor converts them into ContextBench's unified format.
 """
 
+import functools
 import json
+import mmap
 import re
+import sys
 from typing import Dict, List, Any, Optional, Tuple
 
+try:
+    import orjson  # optional: faster parsing for large trajectory lines
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # optional: vectorized interval merging for long trajectories
+except ImportError:
+    np = None
+
+
+def _loads(data: "bytes | str") -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# Command patterns compiled once at import time instead of per run-action
+_SED_RE = re.compile(r"sed\s+-n\s+['\"]?(\d+),(\d+)p['\"]?\s+([^\s&|>;<]+)")
+_NL_SED_RE = re.compile(r"nl\s+[^|]+\s+([^\s|]+)\s*\|\s*sed\s+-n\s+['\"]?(\d+),(\d+)p")
+_HEAD_RE = re.compile(r"\bhead\s+-n\s+(\d+)\s+([^\s&|>]+)")
+_CAT_RE = re.compile(r"\bcat\s+(?:-n\s+)?([^\s&|>]+)")
+_GREP_RE = re.compile(
+    r"\bgrep\s+.*\s+([^\s&|>;<'\"]+\.(?:py|js|java|go|rs|c|cpp|h|hpp|ts|tsx|jsx|rb|php|cs|kt|scala|swift))(?:\s*(?:\||&|;|$))"
+)
+
 
 def extract_trajectory(traj_file_or_data, instance_id: str = None) -> Dict[str, Any]:
     """Extract trajectory steps and final context from OpenHands trajectory.
@@ -30,28 +57,44 @@ def extract_trajectory(traj_file_or_data, instance_id: str = None) -> Dict[str,
     if isinstance(traj_file_or_data, dict):
         data = traj_file_or_data
     else:
-        # Handle file path input
+        # Handle file path input. Read in binary with a large buffer:
+        # json.loads accepts bytes directly, so we skip per-line text decoding
+        # of lines we end up discarding anyway.
         traj_file = traj_file_or_data
-        with open(traj_file, 'r', encoding='utf-8') as f:
-            # If instance_id specified, search for it
-            if instance_id:
-                data = None
-                for line in f:
-                    line = line.strip()
+        with open(traj_file, 'rb', buffering=1 << 20) as f:
+            # Scan over an mmap when possible so the needle search below runs
+            # against the page cache instead of copied read buffers.
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                buf = f  # empty file or mmap-unfriendly filesystem
+            try:
+                # If instance_id specified, search for it
+                if instance_id:
+                    # A raw substring scan rules out non-matching lines without
+                    # paying the JSON parse; the parsed-field check below still
+                    # confirms the match (the needle could hit another field).
+                    needle = instance_id.encode('utf-8')
+                    data = None
+                    for line in iter(buf.readline, b''):
+                        line = line.strip()
+                        if not line or needle not in line:
+                            continue
+                        obj = _loads(line)
+                        if obj.get('instance_id') == instance_id:
+                            data = obj
+                            break
+                    if data is None:
+                        return {"pred_steps": [], "pred_files": [], "pred_spans": {}}
+                else:
+                    # Read first line (default behavior)
+                    line = buf.readline().strip()
                     if not line:
-                        continue
-                    obj = json.loads(line)
-                    if obj.get('instance_id') == instance_id:
-                        data = obj
-                        break
-                if data is None:
-                    return {"pred_steps": [], "pred_files": [], "pred_spans": {}}
-            else:
-                # Read first line (default behavior)
-                line = f.readline().strip()
-                if not line:
-                    return {"pred_steps": [], "pred_files": [], "pred_spans": {}}
-                data = json.loads(line)
+                        return {"pred_steps": [], "pred_files": [], "pred_spans": {}}
+                    data = _loads(line)
+            finally:
+                if buf is not f:
+                    buf.close()
     
     # Some trajectories may contain `"history": null`.
     # Treat it as an empty history instead of crashing.
@@ -139,12 +182,18 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
     # Skip commands that are clearly not file viewing
     if any(kw in command for kw in ['git add', 'git commit', 'rm ', 'mkdir', 'echo ', 'sed -i']):
         return None
-    
+
+    # Cheap substring sanity check before any regex work: most commands
+    # (cd, ls, python, ...) mention none of the viewing tools at all.
+    if not any(k in command for k in ('sed', 'nl', 'head', 'cat', 'grep')):
+        return None
+
     views: List[Dict[str, Any]] = []
-    
-    # Try various command patterns
+
+    # Try various command patterns; each pattern only runs when its tool name
+    # appears in the command at all, skipping the regex engine otherwise.
     # 1. sed -n 'start,endp' file
-    for match in re.finditer(r"sed\s+-n\s+['\"]?(\d+),(\d+)p['\"]?\s+([^\s&|>;<]+)", command):
+    for match in _SED_RE.finditer(command) if 'sed' in command else ():
         start, end, file_path = int(match.group(1)), int(match.group(2)), match.group(3)
         norm_path = _normalize_path(file_path)
         if norm_path:
@@ -155,7 +204,7 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
             })
     
     # 2. nl ... file | sed -n 'start,endp'
-    for match in re.finditer(r"nl\s+[^|]+\s+([^\s|]+)\s*\|\s*sed\s+-n\s+['\"]?(\d+),(\d+)p", command):
+    for match in _NL_SED_RE.finditer(command) if 'nl' in command else ():
         file_path, start, end = match.group(1).strip("'\""), int(match.group(2)), int(match.group(3))
         norm_path = _normalize_path(file_path)
         if norm_path:
@@ -166,7 +215,7 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
             })
     
     # 3. head -n N file
-    for match in re.finditer(r"\bhead\s+-n\s+(\d+)\s+([^\s&|>]+)", command):
+    for match in _HEAD_RE.finditer(command) if 'head' in command else ():
         n, file_path = int(match.group(1)), match.group(2).strip("'\"")
         norm_path = _normalize_path(file_path)
         if norm_path:
@@ -177,7 +226,7 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
             })
     
     # 4. cat file (file-only, no line range)
-    for match in re.finditer(r"\bcat\s+(?:-n\s+)?([^\s&|>]+)", command):
+    for match in _CAT_RE.finditer(command) if 'cat' in command else ():
         file_path = match.group(1).strip("'\"")
         norm_path = _normalize_path(file_path)
         if norm_path:
@@ -186,7 +235,7 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
     # 5. grep with single file target (file-only)
     # Pattern: grep ... <file_with_extension> (at end of command or before pipe/redirect)
     # Be conservative: only match when file is clearly the last argument
-    grep_match = re.search(r"\bgrep\s+.*\s+([^\s&|>;<'\"]+\.(?:py|js|java|go|rs|c|cpp|h|hpp|ts|tsx|jsx|rb|php|cs|kt|scala|swift))(?:\s*(?:\||&|;|$))", command)
+    grep_match = _GREP_RE.search(command) if 'grep' in command else None
     if grep_match:
         file_path = grep_match.group(1).strip("'\"")
         # Verify it's not a pattern by checking if it's a plausible file path
@@ -223,14 +272,21 @@ def _extract_from_run_command(command: str) -> Optional[Dict[str, Any]]:
             })
     
     return {
-        'files': sorted(set(files)),
+        # Insertion-order dedup: steps hold 1-3 files, so dict.fromkeys beats
+        # set+sort and stays deterministic; final ordering is handled once in
+        # _aggregate_steps.
+        'files': list(dict.fromkeys(files)),
         'spans': spans_by_file
     }
 
 
+@functools.lru_cache(maxsize=8192)
 def _normalize_path(path: str) -> str:
     """Normalize container paths to *candidate* repo-relative paths.
-    
+
+    Trajectories view the same handful of paths over and over, so the
+    normalization is memoized.
+
     Note: final validation is performed later in evaluation by resolving path suffixes
     against the checked-out repo worktree. Here we avoid hard-coded prefix rules as much
     as possible and do not drop unknown absolute prefixes.
@@ -251,8 +307,10 @@ def _normalize_path(path: str) -> str:
     # Normalize leading "./"
     if p.startswith("./"):
         p = p[2:]
-    
-    return p
+
+    # Interning makes every step/span structure share one string object per
+    # path and lets dict lookups take the identity-compare shortcut.
+    return sys.intern(p)
 
 
 
@@ -292,7 +350,9 @@ def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """Merge overlapping or adjacent line intervals."""
     if not intervals:
         return []
-    
+    if np is not None and len(intervals) >= 32:
+        return _merge_intervals_np(intervals)
+
     # Sort by start line
     sorted_intervals = sorted((int(a), int(b)) for a, b in intervals)
     merged = [sorted_intervals[0]]
@@ -305,6 +365,18 @@ def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
             merged[-1] = (last_start, max(last_end, end))
         else:
             merged.append((start, end))
-    
+
     return merged
 
+
+def _merge_intervals_np(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Vectorized merge: sort columns, running-max the ends, split on gaps."""
+    arr = np.asarray(intervals, dtype=np.int64)
+    order = np.argsort(arr[:, 0], kind='stable')
+    starts, ends = arr[order, 0], arr[order, 1]
+    run_max = np.maximum.accumulate(ends)
+    # A new group begins wherever a start exceeds the furthest end so far + 1
+    breaks = np.flatnonzero(starts[1:] > run_max[:-1] + 1) + 1
+    bounds = zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(starts)])))
+    return [(int(starts[a]), int(run_max[b - 1])) for a, b in bounds]
+